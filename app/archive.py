@@ -0,0 +1,229 @@
+"""Архив давно истекших договоров.
+
+Договоры, истекшие больше ARCHIVE_DAYS дней назад, переносятся пачками
+в отдельную базу data/archive.db (рядом с основной) вместе с записями
+их документов; сами файлы документов остаются в хранилище. Рабочая база
+остается небольшой: таблица, поиск и проверка истекающих договоров
+не просматривают годы закрытых договоров.
+
+Архив подключается к соединению командой ATTACH DATABASE; временное
+представление contracts_history объединяет (UNION ALL) рабочие и архивные
+договоры для запросов, которым нужна история. Строки архива получают
+собственные id (AUTOINCREMENT), а id рабочей базы сохраняются в original_id:
+SQLite выдает освободившиеся id новым договорам и документам, и тот же id
+может попасть в архив второй раз. В представлении id архивных договоров
+отрицательные, чтобы строки таблицы различались. Архив ведется только в SQLite.
+"""
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy import (
+    MetaData, Table, Column, Index, Integer, DateTime, select, insert, delete, func, literal
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.util import ClauseAdapter
+from .models import Contract, Document
+
+SCHEMA = 'archive'
+HISTORY_VIEW = 'contracts_history'
+
+# Через сколько дней после окончания договор переносится в архив
+ARCHIVE_DAYS = int(os.environ.get('ARCHIVE_DAYS', 365))
+# Сколько договоров переносить одной транзакцией
+BATCH_SIZE = 500
+
+_contracts = Contract.__table__
+_documents = Document.__table__
+
+# Таблицы архива повторяют колонки рабочих, но без ограничений: номер договора
+# может повториться (договор с тем же номером заключен заново и тоже истек).
+# id - собственный ключ архива, original_id - id строки в рабочей базе;
+# contract_id документа ссылается на id договора в архиве
+_metadata = MetaData(schema=SCHEMA)
+archived_contracts = Table(
+    'contracts', _metadata,
+    Column('id', Integer, primary_key=True),
+    Column('original_id', Integer, nullable=False),
+    *(Column(column.name, column.type) for column in _contracts.columns if column.name != 'id'),
+    Column('archived_at', DateTime),
+    Index('ix_archive_contracts_end_date', 'end_date'),
+    Index('ix_archive_contracts_number', 'number'),
+    # Один и тот же договор не попадает в архив дважды (см. _copy_batch)
+    Index('ux_archive_contracts_original', 'original_id', 'number', 'start_date', 'end_date',
+          unique=True),
+    sqlite_autoincrement=True,
+)
+archived_documents = Table(
+    'documents', _metadata,
+    Column('id', Integer, primary_key=True),
+    Column('original_id', Integer, nullable=False),
+    *(Column(column.name, column.type) for column in _documents.columns if column.name != 'id'),
+    Index('ix_archive_documents_contract_id', 'contract_id'),
+    sqlite_autoincrement=True,
+)
+
+# Представление для запросов Core: те же колонки, что у contracts
+history = Table(HISTORY_VIEW, MetaData(), *(Column(column.name, column.type)
+                                            for column in _contracts.columns))
+
+_names = ', '.join(column.name for column in _contracts.columns if column.name != 'id')
+_HISTORY_SQL = (
+    f"CREATE TEMP VIEW IF NOT EXISTS {HISTORY_VIEW} AS "
+    f"SELECT id, {_names} FROM main.contracts "
+    f"UNION ALL SELECT -id, {_names} FROM {SCHEMA}.contracts")
+
+
+def is_available(engine):
+    """Архив подключается командой ATTACH - только для SQLite"""
+    return engine.dialect.name == 'sqlite'
+
+
+def archive_path(engine):
+    """Путь к архиву: переменная окружения ARCHIVE_PATH или archive.db рядом с базой"""
+    path = os.environ.get('ARCHIVE_PATH')
+    if path:
+        return path
+    database = make_url(str(engine.url)).database or ''
+    return os.path.join(os.path.dirname(database) or '.', 'archive.db')
+
+
+def attach(conn):
+    """Подключает архив к соединению и создает представление contracts_history.
+
+    Выполняется один раз на соединение из пула и до начала транзакции
+    (ATTACH внутри транзакции SQLite не выполняет)."""
+    if conn.info.get(SCHEMA):
+        return
+    conn.exec_driver_sql(f"ATTACH DATABASE ? AS {SCHEMA}", (archive_path(conn.engine),))
+    _metadata.create_all(conn)
+    conn.exec_driver_sql(_HISTORY_SQL)
+    conn.info[SCHEMA] = True
+
+
+def history_adapter():
+    """Переносит запрос по колонкам contracts на представление contracts_history"""
+    return ClauseAdapter(
+        history, adapt_on_names=True,
+        include_fn=lambda column: getattr(column, 'table', None) is _contracts)
+
+
+def _expired(cutoff):
+    return _contracts.c.end_date < cutoff
+
+
+def count_expired(engine, days=ARCHIVE_DAYS):
+    """Число договоров, которые можно перенести в архив"""
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).where(
+            _expired(date.today() - timedelta(days=days)))).scalar()
+
+
+def count_archived(engine):
+    """Число договоров в архиве"""
+    with engine.connect() as conn:
+        attach(conn)
+        return conn.execute(select(func.count()).select_from(archived_contracts)).scalar()
+
+
+def archived_files(engine, file_paths=None):
+    """Файлы, на которые ссылаются документы архива (из file_paths или все)"""
+    if file_paths is not None:
+        file_paths = list(file_paths)
+        if not file_paths:
+            return set()
+    if not is_available(engine) or not os.path.exists(archive_path(engine)):
+        return set()
+    statement = select(archived_documents.c.file_path.distinct())
+    if file_paths is not None:
+        statement = statement.where(archived_documents.c.file_path.in_(file_paths))
+    with engine.connect() as conn:
+        attach(conn)
+        return set(conn.execute(statement).scalars())
+
+
+def document_paths(engine, contract_id):
+    """Пути к файлам документов архивного договора (id договора в архиве)"""
+    with engine.connect() as conn:
+        attach(conn)
+        return conn.execute(
+            select(archived_documents.c.file_path)
+            .where(archived_documents.c.contract_id == contract_id)
+            .order_by(archived_documents.c.id)).scalars().all()
+
+
+def _copied(archived):
+    """Условие: договор из contracts уже есть в архиве (тот же original_id, номер и даты)"""
+    c = _contracts.c
+    return select(archived.c.id).where(
+        archived.c.original_id == c.id, archived.c.number == c.number,
+        archived.c.start_date == c.start_date, archived.c.end_date == c.end_date).exists()
+
+
+def _copy_batch(conn, ids, now):
+    """Копирует договоры и их документы в архив обычным INSERT (новые строки архива).
+
+    Договор, который уже есть в архиве с тем же original_id, номером и датами,
+    пропускается: это повторный перенос после сбоя, когда архив успел
+    сохранить пачку, а удаление из рабочей базы - нет. Любой другой
+    конфликт - ошибка."""
+    archived = archived_contracts.alias('archived')
+    c = _contracts.c
+    names = [column.name for column in _contracts.columns if column.name != 'id']
+    conn.execute(insert(archived_contracts).from_select(
+        ['original_id'] + names + ['archived_at'],
+        select(c.id, *(c[name] for name in names), literal(now, DateTime))
+        .where(c.id.in_(ids), ~_copied(archived))))
+
+    # Документы - только договоров, скопированных этой пачкой
+    d = _documents.c
+    names = [column.name for column in _documents.columns if column.name not in ('id', 'contract_id')]
+    conn.execute(insert(archived_documents).from_select(
+        ['original_id', 'contract_id'] + names,
+        select(d.id, archived.c.id, *(d[name] for name in names))
+        .join(archived, (archived.c.original_id == d.contract_id)
+              & (archived.c.archived_at == literal(now, DateTime)))
+        .where(d.contract_id.in_(ids))))
+
+
+def _delete_copied(conn, ids):
+    """Удаляет из рабочей базы договоры, копия которых уже есть в архиве; возвращает их id"""
+    copied = conn.execute(
+        select(_contracts.c.id)
+        .where(_contracts.c.id.in_(ids), _copied(archived_contracts.alias('archived')))
+    ).scalars().all()
+    # Документы, их текст в индексе и отправленные уведомления удаляют триггеры.
+    # Триггеры журнала изменений записывают удаление (D) договоров и документов:
+    # другие копии программы увидят перенесенные договоры как удаленные
+    conn.execute(delete(_contracts).where(_contracts.c.id.in_(copied)))
+    return copied
+
+
+def archive_contracts(engine, days=ARCHIVE_DAYS, progress=None):
+    """Переносит в архив договоры, истекшие больше days дней назад; возвращает их число.
+
+    Пачка переносится двумя транзакциями: копия фиксируется в архиве,
+    затем из рабочей базы удаляются договоры, копия которых есть в архиве.
+    В режиме WAL SQLite фиксирует каждый файл базы отдельно, и одна
+    транзакция на оба файла после сбоя могла бы оставить удаление без копии;
+    так сбой оставляет в худшем случае копию без удаления, и повторный запуск
+    ее не дублирует (см. _copy_batch). progress(перенесено, всего) вызывается
+    после каждой пачки; исключение из него прерывает перенос, уже перенесенные
+    пачки остаются в архиве."""
+    cutoff = date.today() - timedelta(days=days)
+    total = count_expired(engine, days)
+    moved = 0
+    while moved < total:
+        with engine.connect() as conn:
+            attach(conn)
+            ids = conn.execute(
+                select(_contracts.c.id).where(_expired(cutoff))
+                .order_by(_contracts.c.id).limit(BATCH_SIZE)).scalars().all()
+            if not ids:
+                break
+            _copy_batch(conn, ids, datetime.now())
+            conn.commit()
+            copied = _delete_copied(conn, ids)
+            conn.commit()
+        moved += len(copied)
+        if progress:
+            progress(moved, total)
+    return moved
@@ -0,0 +1,143 @@
+"""Журнал изменений договоров и документов для обновления других копий программы.
+
+Триггеры дописывают в change_log строку на каждую вставку, изменение
+и удаление (в том числе при массовом импорте и из других процессов).
+Клиент запоминает последнюю обработанную версию и дешево проверяет
+базу: PRAGMA data_version меняется, только когда другое соединение
+зафиксировало транзакцию, и лишь тогда читаются новые записи журнала.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import text, select, func, delete
+from .models import ChangeLogEntry
+
+# Больше изменений за раз проще применить полной перезагрузкой таблицы
+MAX_BATCH = 1000
+# Сколько дней хранить записи журнала
+KEEP_DAYS = 30
+
+_log = ChangeLogEntry.__table__
+
+_TRIGGERS = []
+for _table, _contract in (('contracts', 'id'), ('documents', 'contract_id')):
+    for _event, _row, _operation in (('INSERT', 'new', 'I'), ('UPDATE', 'new', 'U'),
+                                     ('DELETE', 'old', 'D')):
+        _TRIGGERS.append(
+            f"""CREATE TRIGGER IF NOT EXISTS change_log_{_table}_{_operation.lower()}
+            AFTER {_event} ON {_table} BEGIN
+                INSERT INTO change_log(table_name, row_id, contract_id, operation)
+                VALUES ('{_table}', {_row}.id, {_row}.{_contract}, '{_operation}');
+            END""")
+
+# Изменения договоров с версии since: id измененных (в том числе добавленных),
+# из них добавленных, и удаленных договоров.
+# reset - изменений слишком много (или журнал очищен), нужна полная перезагрузка
+ChangeSet = namedtuple('ChangeSet', 'version changed inserted deleted reset')
+
+
+def create_change_log(conn):
+    """Триггеры журнала изменений (сама таблица создается вместе с моделями)"""
+    if conn.dialect.name != 'sqlite':
+        return
+    for statement in _TRIGGERS:
+        conn.execute(text(statement))
+
+
+def current_version(conn):
+    return conn.execute(select(func.coalesce(func.max(_log.c.version), 0))).scalar()
+
+
+def read_changes(conn, since, limit=MAX_BATCH):
+    """Собирает изменения после версии since в ChangeSet"""
+    rows = conn.execute(
+        select(_log.c.version, _log.c.table_name, _log.c.row_id,
+               _log.c.contract_id, _log.c.operation)
+        .where(_log.c.version > since)
+        .order_by(_log.c.version)
+        .limit(limit + 1)
+    ).all()
+    if not rows:
+        return ChangeSet(since, set(), set(), set(), False)
+
+    version = rows[-1][0]
+    # Версии идут без пропусков; пропуск после since - журнал уже очищен
+    pruned = rows[0][0] > since + 1
+    if len(rows) > limit or pruned:
+        return ChangeSet(current_version(conn), set(), set(), set(), True)
+
+    changed, inserted, deleted, documents = set(), set(), set(), set()
+    for _, table_name, row_id, contract_id, operation in rows:
+        if table_name == 'contracts' and operation == 'D':
+            changed.discard(row_id)
+            inserted.discard(row_id)
+            deleted.add(row_id)
+        elif table_name == 'contracts':
+            changed.add(contract_id)
+            if operation == 'I':
+                inserted.add(contract_id)
+        elif contract_id is not None:
+            # Изменение документа тоже обновляет строку его договора
+            documents.add(contract_id)
+    # Договор удален и добавлен заново с тем же id - для клиента это изменение
+    removed = deleted - changed
+    # Документы удаленного договора удаляются каскадом - это не изменение договора
+    changed |= documents - removed
+    return ChangeSet(version, changed, inserted - deleted, removed, False)
+
+
+def prune_change_log(conn, keep_days=KEEP_DAYS):
+    """Удаляет записи журнала старше keep_days дней"""
+    conn.execute(delete(_log).where(
+        _log.c.changed_at < datetime.now() - timedelta(days=keep_days)))
+
+
+class ChangeTracker:
+    """Следит за изменениями базы, сделанными другими соединениями.
+
+    Держит собственное соединение: data_version этого соединения
+    меняется после фиксации транзакции в любом другом соединении
+    (в этом процессе или в другой копии программы)."""
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._conn = None
+        self._data_version = None
+        self.version = 0
+
+    def start(self):
+        with self._engine.begin() as conn:
+            prune_change_log(conn)
+        self._conn = self._engine.connect()
+        self._data_version = self._read_data_version()
+        self.version = current_version(self._conn)
+        self._conn.rollback()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _read_data_version(self):
+        return self._conn.exec_driver_sql("PRAGMA data_version").scalar()
+
+    def sync(self):
+        """Пропускает накопившиеся изменения (таблица только что перечитана целиком)"""
+        self.version = current_version(self._conn)
+        self._data_version = self._read_data_version()
+        self._conn.rollback()
+
+    def poll(self):
+        """Возвращает ChangeSet или None, если с прошлой проверки ничего не менялось"""
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            self._conn.rollback()
+            return None
+        self._data_version = data_version
+        try:
+            changes = read_changes(self._conn, self.version)
+        finally:
+            self._conn.rollback()
+        if changes.version == self.version and not changes.reset:
+            return None
+        self.version = changes.version
+        return changes
@@ -0,0 +1,278 @@
+"""Командная строка для пакетных заданий (без Qt).
+
+Примеры:
+    python -m app expiring --days 30
+    python -m app notify --watch
+    python -m app import contracts.xlsx --mode upsert
+    python -m app export contracts.csv
+    python -m app stats
+    python -m app verify-docs
+    python -m app index-docs
+    python -m app search-docs "штрафные санкции"
+    python -m app archive --days 365
+    python -m app report --file reports.xlsx
+"""
+import argparse
+import os
+import sys
+
+
+def cmd_expiring(args, session=None):
+    """Выводит договоры, истекающие в ближайшие N дней"""
+    from .notifications import check_expiring_contracts, find_expiring_contracts, send_notification
+
+    if session is None:
+        expiring = find_expiring_contracts(args.db, args.days)
+    else:
+        expiring = sorted(check_expiring_contracts(session, args.days), key=lambda c: c.end_date)
+    for contract in expiring:
+        send_notification(contract)
+    print(f"\nИстекающих договоров: {len(expiring)}")
+    return 0
+
+
+def cmd_notify(args, session):
+    """Уведомления о наступивших порогах (30/7/1/0 дней); каждое - один раз"""
+    from .scheduler import ExpiryScheduler, run_forever
+
+    def notify(contract, threshold, days_left):
+        _, number, name, counterparty, end_date = contract
+        print(f"! Договор {number} '{name}' с {counterparty} истекает через {days_left} дней "
+              f"(до {end_date.strftime('%d.%m.%Y')})", flush=True)
+
+    if args.watch:
+        from .database import get_session
+        run_forever(lambda: get_session(session.get_bind()), notify)
+
+    scheduler = ExpiryScheduler()
+    for contract, threshold, days_left in scheduler.due(session):
+        notify(contract, threshold, days_left)
+    return 0
+
+
+def cmd_import(args, session):
+    """Импорт договоров из Excel"""
+    from .importer import import_contracts
+
+    try:
+        result = import_contracts(session, args.file, args.mode)
+    except ValueError as e:
+        print(f"Ошибка при импорте: {e}", file=sys.stderr)
+        return 1
+    print(result.message(limit=20))
+    return 0
+
+
+def cmd_export(args, session):
+    """Экспорт договоров в xlsx, csv или parquet"""
+    from .exporter import export_contracts
+
+    try:
+        count = export_contracts(session, args.file)
+    except ValueError as e:
+        print(f"Ошибка при экспорте: {e}", file=sys.stderr)
+        return 1
+    print(f"Выгружено договоров: {count}")
+    return 0
+
+
+def cmd_stats(args, session):
+    """Сводка по договорам и (по запросу) проверка планов запросов"""
+    from .database import check_query_plans, get_schema_version
+    from .statistics import compute_statistics
+
+    stats = compute_statistics(session, args.days, detailed=bool(args.top), top=args.top)
+    print(f"Всего договоров: {stats.total}")
+    print(f"Активных: {stats.active}")
+    print(f"Истекших: {stats.expired}")
+    print(f"Истекают в ближайшие {args.days} дней: {stats.expiring}")
+    if args.top:
+        print("\nКрупнейшие контрагенты (всего / активных):")
+        for counterparty, count, active in stats.by_counterparty:
+            print(f"    {counterparty}: {count} / {active}")
+    print(f"Версия схемы: {get_schema_version(session.connection())}")
+
+    if args.check_plans:
+        failed = 0
+        for name, plan, ok in check_query_plans(session.get_bind()):
+            print(f"\n[{'OK' if ok else 'СКАН'}] {name}")
+            for line in plan:
+                print(f"    {line}")
+            failed += not ok
+        return 1 if failed else 0
+    return 0
+
+
+def cmd_verify_docs(args, session):
+    """Проверяет наличие и целостность файлов документов"""
+    from .file_manager import ensure_documents_dir, file_sha256
+    from .models import Document
+
+    problems = 0
+    referenced = set()
+    for document in session.query(Document).order_by(Document.id).yield_per(1000):
+        referenced.add(os.path.normcase(os.path.abspath(document.file_path)))
+        if not os.path.exists(document.file_path):
+            print(f"Нет файла: документ {document.id} ({document.file_name}) -> {document.file_path}")
+            problems += 1
+        elif document.sha256 and file_sha256(document.file_path) != document.sha256:
+            print(f"Файл поврежден: документ {document.id} ({document.file_name})")
+            problems += 1
+
+    if args.orphans:
+        # Файлы документов архивных договоров остаются в хранилище
+        from .archive import archived_files
+
+        referenced.update(os.path.normcase(os.path.abspath(path))
+                          for path in archived_files(session.get_bind()))
+        for root, _, files in os.walk(ensure_documents_dir()):
+            for name in files:
+                path = os.path.normcase(os.path.abspath(os.path.join(root, name)))
+                if path not in referenced:
+                    print(f"Файл без ссылок: {path}")
+
+    print(f"Проблем: {problems}")
+    return 1 if problems else 0
+
+
+def cmd_index_docs(args, session):
+    """Извлекает текст PDF в полнотекстовый индекс (только новые и измененные файлы)"""
+    from .document_index import is_available, index_documents
+
+    if not is_available(session):
+        print("Индекс документов ведется только в SQLite и требует пакет pypdf", file=sys.stderr)
+        return 1
+
+    def progress(done, total):
+        print(f"\rОбработано файлов: {done} из {total}", end="", flush=True)
+
+    indexed, failed = index_documents(session, check_files=True, progress=progress,
+                                      workers=args.workers)
+    print(f"\nПроиндексировано документов: {indexed}, с ошибками разбора: {failed}")
+    return 0
+
+
+def cmd_search_docs(args, session):
+    """Договоры, в тексте документов которых есть все слова, с фрагментами текста"""
+    from .document_index import search_documents
+
+    matches = search_documents(session, args.text, args.limit)
+    for match in matches:
+        print(f"{match.number} ({match.counterparty}), {match.file_name}:")
+        print(f"    {' '.join(match.snippet.split())}")
+    print(f"\nНайдено документов: {len(matches)}")
+    return 0
+
+
+def cmd_archive(args, session):
+    """Переносит давно истекшие договоры в архив (data/archive.db)"""
+    from .archive import ARCHIVE_DAYS, is_available, archive_contracts, count_archived
+
+    engine = session.get_bind()
+    if not is_available(engine):
+        print("Архив договоров поддерживается только для базы SQLite", file=sys.stderr)
+        return 1
+
+    def progress(done, total):
+        print(f"\rПеренесено договоров: {done} из {total}", end="", flush=True)
+
+    days = args.days if args.days is not None else ARCHIVE_DAYS
+    moved = archive_contracts(engine, days, progress=progress)
+    print(f"\nПеренесено в архив: {moved}, всего в архиве: {count_archived(engine)}")
+    return 0
+
+
+def cmd_report(args, session):
+    """Отчеты по договорам; с --file - выгрузка в Excel"""
+    from .reports import get_reports, export_reports
+
+    reports = get_reports(session, args.months)
+    print(f"Всего договоров: {reports.total}, активных: {reports.active}")
+    print(f"Средняя длительность: {reports.average_days} дней, медианная: {reports.median_days}")
+    print(f"Истекают в ближайшие {args.months} мес.: {len(reports.renewals)}")
+    if args.file:
+        export_reports(reports, args.file)
+        print(f"Отчеты выгружены: {args.file}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m app", description="Управление договорами: пакетные задания")
+    parser.add_argument("--db", help="путь к базе SQLite или URL базы, например postgresql+psycopg://"
+                                     "user:pass@host/contracts (по умолчанию DATABASE_URL, DB_PATH "
+                                     "или data/contracts.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    expiring = commands.add_parser("expiring", help="истекающие договоры")
+    expiring.add_argument("--days", type=int, default=30)
+    # Быстрый путь без SQLAlchemy (только для SQLite): команду запускают из cron
+    # каждые несколько минут
+    expiring.set_defaults(handler=cmd_expiring, needs_session=False)
+
+    notify = commands.add_parser("notify", help="уведомления по порогам 30/7/1/0 дней")
+    notify.add_argument("--watch", action="store_true",
+                        help="работать постоянно, просыпаясь к следующему порогу")
+    notify.set_defaults(handler=cmd_notify)
+
+    import_parser = commands.add_parser("import", help="импорт из Excel")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--mode", choices=("skip", "update", "upsert"), default="skip",
+                               help="что делать с договорами, номера которых уже есть в базе")
+    import_parser.set_defaults(handler=cmd_import)
+
+    export = commands.add_parser("export", help="экспорт в .xlsx, .csv или .parquet")
+    export.add_argument("file")
+    export.set_defaults(handler=cmd_export)
+
+    stats = commands.add_parser("stats", help="сводка по договорам")
+    stats.add_argument("--days", type=int, default=30)
+    stats.add_argument("--top", type=int, default=0, help="показать N крупнейших контрагентов")
+    stats.add_argument("--check-plans", action="store_true",
+                       help="проверить, что частые запросы используют индексы")
+    stats.set_defaults(handler=cmd_stats)
+
+    verify = commands.add_parser("verify-docs", help="проверка файлов документов")
+    verify.add_argument("--orphans", action="store_true", help="показать файлы без ссылок")
+    verify.set_defaults(handler=cmd_verify_docs)
+
+    index_docs = commands.add_parser("index-docs", help="индексация текста PDF для поиска")
+    index_docs.add_argument("--workers", type=int, default=4, help="число процессов разбора PDF")
+    index_docs.set_defaults(handler=cmd_index_docs)
+
+    search_docs = commands.add_parser("search-docs", help="поиск по тексту документов")
+    search_docs.add_argument("text")
+    search_docs.add_argument("--limit", type=int, default=50)
+    search_docs.set_defaults(handler=cmd_search_docs)
+
+    report = commands.add_parser("report", help="отчеты: окончания по месяцам, контрагенты, "
+                                                "календарь продлений")
+    report.add_argument("--file", help="выгрузить отчеты в .xlsx")
+    report.add_argument("--months", type=int, default=12, help="горизонт календаря продлений")
+    report.set_defaults(handler=cmd_report)
+
+    archive = commands.add_parser("archive", help="перенос давно истекших договоров в архив")
+    archive.add_argument("--days", type=int, default=None,
+                         help="сколько дней назад должен истечь договор (по умолчанию ARCHIVE_DAYS "
+                              "или 365)")
+    archive.set_defaults(handler=cmd_archive)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Не импортируем app.database ради пути: это потянуло бы SQLAlchemy
+    args.db = args.db or os.environ.get('DATABASE_URL') or os.environ.get('DB_PATH', 'data/contracts.db')
+
+    if not getattr(args, "needs_session", True) and '://' not in args.db:
+        if not os.path.exists(args.db):
+            from .database import get_engine
+            get_engine(args.db)
+        return args.handler(args)
+
+    from .database import get_engine, session_scope
+
+    engine = get_engine(args.db)
+    with session_scope(engine) as session:
+        return args.handler(args, session)
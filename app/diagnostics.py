@@ -0,0 +1,165 @@
+"""Диагностика производительности: SQL-запросы, вызовы модели таблицы, таймеры.
+
+По умолчанию выключена и почти ничего не стоит: обработчики событий
+SQLAlchemy не подключены, timed() возвращает пустой контекст, а модель
+таблицы проверяет только флаг enabled. Включается переменной окружения
+CONTRACTS_DIAGNOSTICS=1 или из панели "Диагностика" (Ctrl+Shift+D).
+Если задана CONTRACTS_DIAGNOSTICS_LOG, каждое измерение дописывается
+в этот файл строкой JSON.
+"""
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Сколько самых медленных запросов хранить
+SLOWEST_LIMIT = 20
+
+enabled = False
+_log_path = None
+_lock = threading.Lock()
+_queries = {}   # форма запроса -> [количество, суммарно мс, максимум мс]
+_slowest = []   # min-куча (мс, форма, параметры)
+_timers = {}    # имя -> [количество, суммарно мс, максимум мс]
+_roles = {}     # роль Qt -> число вызовов data()
+_NULL = nullcontext()
+
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def query_shape(statement):
+    """Нормализует текст запроса: схлопывает пробелы и списки IN (?, ?, ...)"""
+    return _IN_LIST.sub("(?...)", _SPACES.sub(" ", statement).strip())
+
+
+def _add(stats, key, ms):
+    entry = stats.get(key)
+    if entry is None:
+        stats[key] = [1, ms, ms]
+    else:
+        entry[0] += 1
+        entry[1] += ms
+        if ms > entry[2]:
+            entry[2] = ms
+
+
+def _write_log(kind, name, ms):
+    try:
+        with open(_log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "time": datetime.now().isoformat(timespec='milliseconds'),
+                "kind": kind, "name": name, "ms": round(ms, 3),
+            }, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('diagnostics_start', []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('diagnostics_start')
+    if not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    shape = query_shape(statement)
+    with _lock:
+        _add(_queries, shape, ms)
+        sample = (ms, shape, repr(parameters)[:200])
+        if len(_slowest) < SLOWEST_LIMIT:
+            heapq.heappush(_slowest, sample)
+        elif ms > _slowest[0][0]:
+            heapq.heapreplace(_slowest, sample)
+    if _log_path:
+        _write_log("query", shape, ms)
+
+
+def enable(log_path=None):
+    """Включает сбор; log_path - файл для журнала в формате JSON lines"""
+    global enabled, _log_path
+    _log_path = log_path or os.getenv('CONTRACTS_DIAGNOSTICS_LOG') or None
+    if not enabled:
+        event.listen(Engine, 'before_cursor_execute', _before_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_execute)
+        enabled = True
+
+
+def disable():
+    """Выключает сбор (накопленные данные сохраняются до reset())"""
+    global enabled
+    if enabled:
+        event.remove(Engine, 'before_cursor_execute', _before_execute)
+        event.remove(Engine, 'after_cursor_execute', _after_execute)
+        enabled = False
+
+
+def log_path():
+    """Файл журнала или None"""
+    return _log_path
+
+
+def reset():
+    with _lock:
+        _queries.clear()
+        _slowest.clear()
+        _timers.clear()
+        _roles.clear()
+
+
+def count_role(role):
+    """Учитывает вызов data() модели таблицы (вызывать только при enabled)"""
+    _roles[role] = _roles.get(role, 0) + 1
+
+
+@contextmanager
+def _timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        with _lock:
+            _add(_timers, name, ms)
+        if _log_path:
+            _write_log("timer", name, ms)
+
+
+def timed(name):
+    """Контекст, замеряющий длительность операции (пустой, если сбор выключен)"""
+    if not enabled:
+        return _NULL
+    return _timer(name)
+
+
+def _rows(stats):
+    return sorted(
+        ((key, count, total, total / count, slowest)
+         for key, (count, total, slowest) in stats.items()),
+        key=lambda row: row[2], reverse=True)
+
+
+def snapshot():
+    """Копия накопленных данных для отображения.
+
+    queries и timers - списки (ключ, количество, всего мс, среднее мс, максимум мс)
+    по убыванию суммарного времени; slowest - (мс, запрос, параметры);
+    roles - словарь роль -> число вызовов."""
+    with _lock:
+        return {
+            "queries": _rows(_queries),
+            "timers": _rows(_timers),
+            "slowest": sorted(_slowest, reverse=True),
+            "roles": dict(_roles),
+        }
+
+
+if os.getenv('CONTRACTS_DIAGNOSTICS', '').lower() in ('1', 'true', 'yes'):
+    enable()
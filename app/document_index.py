@@ -0,0 +1,211 @@
+"""Полнотекстовый индекс содержимого прикрепленных PDF.
+
+Текст извлекается в фоне пулом процессов (разбор PDF занимает процессор,
+а потоки Python упирались бы в GIL) и один раз записывается в таблицу
+FTS5 documents_fts, rowid которой - documents.id. Поиск читает только
+индекс, сами файлы при поиске не открываются.
+
+Повторная индексация инкрементальная: документ переиндексируется, только
+если изменились хэш содержимого или время изменения файла (document_texts).
+Обычный запуск выбирает документы одним запросом по хэшам, не обращаясь
+к файлам; время изменения файлов сверяется только при полной проверке
+(check_files).
+Индекс ведется только в SQLite, как и полнотекстовый поиск по договорам.
+"""
+import importlib.util
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import text, select, delete, insert, func, Integer, String, column
+from .models import Contract, Document, DocumentText
+from .search import build_match_query
+
+FTS_TABLE = 'documents_fts'
+
+# Сколько документов записывать в базу одной транзакцией
+BATCH_SIZE = 50
+# Число процессов извлечения текста по умолчанию
+MAX_WORKERS = 4
+
+_documents = Document.__table__
+_texts = DocumentText.__table__
+
+_FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        DELETE FROM document_texts WHERE document_id = old.id;
+    END""",
+]
+
+# Найденный документ: договор (id, номер, контрагент), документ, имя файла
+# и фрагмент текста с совпадением
+DocumentMatch = namedtuple(
+    'DocumentMatch', 'contract_id number counterparty document_id file_name snippet')
+
+
+def create_document_index(conn):
+    """Таблица полнотекстового индекса документов и триггер ее очистки"""
+    if conn.dialect.name != 'sqlite':
+        return
+    for statement in _FTS_SCHEMA:
+        conn.execute(text(statement))
+
+
+def is_available(session):
+    """Можно ли индексировать документы: нужны SQLite и пакет pypdf"""
+    # find_spec не импортирует сам пакет - проверка не замедляет запуск программы
+    return (session.get_bind().dialect.name == 'sqlite'
+            and importlib.util.find_spec('pypdf') is not None)
+
+
+def extract_text(file_path):
+    """Текст всех страниц PDF; выполняется в процессе пула, поэтому на уровне модуля"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _extract(file_path):
+    """(текст, ошибка, время изменения файла) - ошибка разбора одного файла
+    не должна прерывать индексацию"""
+    mtime = None
+    try:
+        mtime = os.path.getmtime(file_path)
+        return extract_text(file_path), None, mtime
+    except Exception as e:
+        return "", str(e) or e.__class__.__name__, mtime
+
+
+def pending_documents(session, check_files=False):
+    """Документы, которые нужно (пере)индексировать: [(id, путь, sha256)].
+
+    Без check_files - еще не проиндексированные и документы, хэш которых
+    отличается от проиндексированного (только запрос, файлы не открываются);
+    с check_files - еще и документы, время изменения файла которых
+    отличается от записанного при индексации (проверяется каждый файл)."""
+    statement = (
+        select(_documents.c.id, _documents.c.file_path, _documents.c.sha256,
+               _texts.c.document_id, _texts.c.sha256, _texts.c.mtime)
+        .select_from(_documents.outerjoin(_texts, _texts.c.document_id == _documents.c.id))
+        .order_by(_documents.c.id))
+    if not check_files:
+        statement = statement.where(
+            _texts.c.document_id.is_(None) | _texts.c.sha256.is_distinct_from(_documents.c.sha256))
+        return [(document_id, file_path, sha256)
+                for document_id, file_path, sha256, *_ in session.execute(statement)]
+
+    pending = []
+    for document_id, file_path, sha256, indexed_id, indexed_sha256, indexed_mtime in \
+            session.execute(statement):
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            # Файла нет - индексировать нечего (см. python -m app verify-docs)
+            continue
+        if indexed_id is None or indexed_sha256 != sha256 or indexed_mtime != mtime:
+            pending.append((document_id, file_path, sha256))
+    return pending
+
+
+def count_unindexed(session):
+    """Число документов, еще ни разу не попавших в индекс"""
+    return session.execute(
+        select(func.count()).select_from(
+            _documents.outerjoin(_texts, _texts.c.document_id == _documents.c.id))
+        .where(_texts.c.document_id.is_(None))
+    ).scalar()
+
+
+def _write_batch(session, batch):
+    """Заменяет текст и сведения об индексации документов пачки"""
+    ids = [document_id for document_id, *_ in batch]
+    session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{"id": i} for i in ids])
+    session.execute(delete(_texts).where(_texts.c.document_id.in_(ids)))
+    contents = [{"id": document_id, "content": content}
+                for document_id, _, _, content, _ in batch if content]
+    # Пустой список параметров SQLAlchemy выполнил бы как один запрос без значений
+    if contents:
+        session.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (:id, :content)"), contents)
+    now = datetime.now()
+    session.execute(insert(_texts), [
+        {"document_id": document_id, "sha256": sha256, "mtime": mtime,
+         "error": error, "indexed_at": now}
+        for document_id, sha256, mtime, _, error in batch])
+    session.commit()
+
+
+def index_documents(session, check_files=False, progress=None, workers=MAX_WORKERS):
+    """Индексирует ожидающие документы; возвращает (проиндексировано, с ошибками).
+
+    Одинаковые файлы (хранилище с дедупликацией) разбираются один раз.
+    Документ без файла записывается в индекс с ошибкой и больше не ожидает
+    индексации; при появлении файла его найдет запуск с check_files.
+    progress(сделано, всего) вызывается после каждой пачки; исключение
+    из него прерывает индексацию, уже записанные пачки сохраняются."""
+    pending = pending_documents(session, check_files)
+    paths = list(dict.fromkeys(file_path for _, file_path, _ in pending))
+    if not paths:
+        return 0, 0
+
+    by_path = {}
+    for document_id, file_path, sha256 in pending:
+        by_path.setdefault(file_path, []).append((document_id, sha256))
+
+    # Один файл (только что прикрепленный документ) быстрее разобрать на месте,
+    # чем запускать процессы
+    pool = ProcessPoolExecutor(min(workers, len(paths))) if len(paths) > 1 else None
+    results = pool.map(_extract, paths, chunksize=4) if pool else map(_extract, paths)
+
+    indexed = failed = done = 0
+    batch = []
+    try:
+        # Время изменения файла берет процесс, который его разбирает
+        for file_path, (content, error, mtime) in zip(paths, results):
+            for document_id, sha256 in by_path[file_path]:
+                batch.append((document_id, sha256, mtime, content, error))
+            failed += error is not None
+            done += 1
+            if len(batch) >= BATCH_SIZE or done == len(paths):
+                _write_batch(session, batch)
+                indexed += len(batch)
+                batch = []
+                if progress:
+                    progress(done, len(paths))
+    finally:
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return indexed, failed
+
+
+def search_documents(session, search_text, limit=100):
+    """Документы, текст которых содержит все слова (по началу слова), по релевантности"""
+    query = build_match_query(search_text or "")
+    if not query or session.get_bind().dialect.name != 'sqlite':
+        return []
+    matches = text(
+        f"SELECT rowid, rank, snippet({FTS_TABLE}, 0, '«', '»', '…', 12) AS snippet "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :document_query ORDER BY rank LIMIT :limit"
+    ).bindparams(document_query=query, limit=limit).columns(
+        column('rowid', Integer), column('rank'), column('snippet', String)).subquery()
+    rows = session.execute(
+        select(_documents.c.contract_id, Contract.number, Contract.counterparty,
+               _documents.c.id, _documents.c.file_name, matches.c.snippet)
+        .join(matches, matches.c.rowid == _documents.c.id)
+        .join(Contract, Contract.id == _documents.c.contract_id)
+        .order_by(matches.c.rank)
+    ).all()
+    return [DocumentMatch(*row) for row in rows]
+
+
+def document_matches(search_text):
+    """Подзапрос id договоров, в документах которых есть все слова (для условий поиска)"""
+    matches = text(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :document_query"
+    ).bindparams(document_query=build_match_query(search_text)).columns(column('rowid', Integer))
+    return select(_documents.c.contract_id).where(_documents.c.id.in_(matches))
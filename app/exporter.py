@@ -0,0 +1,186 @@
+import csv
+import os
+from datetime import date
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import select, func
+from . import diagnostics
+from .models import Contract
+
+EXPORT_HEADERS = [
+    "Номер", "Наименование", "Контрагент", "Дата начала", "Дата окончания",
+    "Дней осталось", "Статус", "Описание"
+]
+
+# Сколько строк читать из базы и записывать за один раз
+BATCH_SIZE = 5000
+# Ограничение на число параметров в IN (...) при экспорте выделенных договоров
+IDS_CHUNK = 500
+
+_contracts = Contract.__table__
+
+
+def _select_contracts(table=_contracts):
+    c = table.c
+    return select(
+        c.number, c.name, c.counterparty, c.start_date, c.end_date, c.description
+    ).order_by(c.end_date, c.id)
+
+
+def iter_export_batches(session, ids=None, batch_size=BATCH_SIZE):
+    """Читает договоры пачками строк Core (без ORM-объектов).
+
+    Отрицательные ids - архивные договоры из таблицы с архивом
+    (id в представлении contracts_history, см. archive.py).
+    Каждая строка: номер, наименование, контрагент, начало, окончание,
+    дней осталось, статус, описание."""
+    today = date.today()
+
+    if ids is None:
+        statements = [_select_contracts()]
+    else:
+        ids = list(ids)
+        tables = [(_contracts, [i for i in ids if i > 0])]
+        archived_ids = [-i for i in ids if i < 0]
+        if archived_ids:
+            from .archive import attach, archived_contracts
+            attach(session.connection())
+            tables.append((archived_contracts, archived_ids))
+        statements = [
+            _select_contracts(table).where(table.c.id.in_(table_ids[i:i + IDS_CHUNK]))
+            for table, table_ids in tables
+            for i in range(0, len(table_ids), IDS_CHUNK)
+        ]
+
+    for statement in statements:
+        result = session.execute(statement.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            batch = []
+            for number, name, counterparty, start_date, end_date, description in partition:
+                days_left = (end_date - today).days
+                batch.append((
+                    number, name, counterparty, start_date, end_date, days_left,
+                    "Активен" if days_left >= 0 else "Истек", description or ""
+                ))
+            yield batch
+
+
+def _format_date(value):
+    return value.strftime("%d.%m.%Y")
+
+
+def _text_rows(batch):
+    """Строки с датами в формате ДД.ММ.ГГГГ (как их ожидает импорт)"""
+    for row in batch:
+        yield row[:3] + (_format_date(row[3]), _format_date(row[4])) + row[5:]
+
+
+def write_xlsx(batches, file_path, headers=EXPORT_HEADERS, sheet_name='Договоры'):
+    """Потоковая запись в xlsx (openpyxl write_only)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(headers)
+    count = 0
+    for batch in batches:
+        for row in _text_rows(batch):
+            sheet.append(row)
+        count += len(batch)
+    workbook.save(file_path)
+    return count
+
+
+def write_report_xlsx(tables, file_path):
+    """Таблицы отчета (title, headers, rows) в книгу xlsx, по листу на таблицу"""
+    workbook = Workbook(write_only=True)
+    for title, headers, rows in tables:
+        # Имя листа Excel - не длиннее 31 символа
+        sheet = workbook.create_sheet(title[:31])
+        sheet.append(headers)
+        for row in rows:
+            sheet.append([_report_cell(sheet, value) for value in row])
+    workbook.save(file_path)
+    return len(tables)
+
+
+def _report_cell(sheet, value):
+    if not isinstance(value, date):
+        return value
+    # Даты остаются датами Excel (по ним можно строить сводные таблицы)
+    cell = WriteOnlyCell(sheet, value)
+    cell.number_format = 'DD.MM.YYYY'
+    return cell
+
+
+def write_csv(batches, file_path, headers=EXPORT_HEADERS):
+    """Запись в CSV (UTF-8 с BOM и разделителем ';' - так его открывает Excel)"""
+    count = 0
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(headers)
+        for batch in batches:
+            writer.writerows(_text_rows(batch))
+            count += len(batch)
+    return count
+
+
+def write_parquet(batches, file_path, headers=EXPORT_HEADERS):
+    """Запись в Parquet по группам строк (нужен pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Для экспорта в Parquet установите пакет pyarrow")
+
+    schema = pa.schema([
+        (headers[0], pa.string()), (headers[1], pa.string()), (headers[2], pa.string()),
+        (headers[3], pa.date32()), (headers[4], pa.date32()), (headers[5], pa.int32()),
+        (headers[6], pa.string()), (headers[7], pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(file_path, schema) as writer:
+        for batch in batches:
+            columns = list(zip(*batch)) if batch else [[] for _ in headers]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema))
+            count += len(batch)
+    return count
+
+
+_WRITERS = {
+    '.xlsx': write_xlsx,
+    '.csv': write_csv,
+    '.parquet': write_parquet,
+}
+
+
+def _with_progress(batches, progress, total):
+    done = 0
+    for batch in batches:
+        yield batch
+        done += len(batch)
+        progress(done, total)
+
+
+def export_contracts(session, file_path, ids=None, progress=None):
+    """Экспортирует договоры (все или с указанными id) в файл.
+
+    Формат определяется расширением: .xlsx, .csv или .parquet.
+    progress(выгружено, всего) вызывается после каждой пачки; исключение
+    из него прерывает экспорт. Возвращает количество выгруженных договоров."""
+    extension = os.path.splitext(file_path)[1].lower()
+    writer = _WRITERS.get(extension)
+    if writer is None:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {extension or file_path}")
+
+    if ids is not None:
+        ids = list(ids)
+    batches = iter_export_batches(session, ids)
+    if progress:
+        if ids is not None:
+            total = len(ids)
+        else:
+            total = session.execute(select(func.count()).select_from(_contracts)).scalar()
+        batches = _with_progress(batches, progress, total)
+    with diagnostics.timed('export'):
+        return writer(batches, file_path)
@@ -1,30 +1,120 @@
-import os
-import shutil
-from datetime import datetime
-from pathlib import Path
-
-
-def ensure_documents_dir():
-    """Создает папку для документов, если ее нет"""
-    docs_dir = Path('data/documents')
-    docs_dir.mkdir(parents=True, exist_ok=True)
-    return docs_dir
-
-def save_document(file_obj, contract_number):
-    """Сохраняет PDF-документ в папку documents"""
-    docs_dir = ensure_documents_dir()
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_name = f"contract_{contract_number}_{timestamp}.pdf"
-    file_path = docs_dir / file_name
-    
-    with open(file_path, 'wb') as f:
-        shutil.copyfileobj(file_obj, f)
-    
-    return file_name, str(file_path)
-
-def delete_document(file_path):
-    """Удаляет документ"""
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        return True
-    return False
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from sqlalchemy import event, select, exists
+from sqlalchemy.orm import aliased
+from . import diagnostics
+from .models import Document
+
+# Размер блока при чтении файла (хэширование, копирование в хранилище)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def ensure_documents_dir():
+    """Создает папку для документов, если ее нет"""
+    docs_dir = Path('data/documents')
+    docs_dir.mkdir(parents=True, exist_ok=True)
+    return docs_dir
+
+def file_sha256(file_path):
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def blob_path(sha256, suffix='.pdf'):
+    """Путь к файлу в хранилище: <первые 2 символа хэша>/<хэш><расширение>"""
+    return ensure_documents_dir() / sha256[:2] / f"{sha256}{suffix}"
+
+def _copy_hashed(source_path, target_path):
+    """Копирует файл и одновременно считает SHA-256 его содержимого (один проход чтения)"""
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        for block in iter(lambda: src.read(HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+            dst.write(block)
+    return digest.hexdigest()
+
+def save_document(source_path):
+    """Сохраняет PDF-документ в хранилище по хэшу содержимого.
+
+    Одинаковые файлы хранятся один раз. Возвращает (sha256, путь к файлу)."""
+    with diagnostics.timed('document_copy'):
+        # Хэш известен только после чтения файла, поэтому копируем во временный
+        # файл в хранилище (тот же диск) и переименовываем в путь по хэшу.
+        # Переименование атомарно: параллельные загрузки одного файла не мешают друг другу
+        temp_path = ensure_documents_dir() / f".{uuid.uuid4().hex}.tmp"
+        try:
+            sha256 = _copy_hashed(source_path, temp_path)
+            target = blob_path(sha256, Path(source_path).suffix.lower() or '.pdf')
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, target)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    return sha256, str(target)
+
+def delete_document(session, document):
+    """Удаляет документ из базы.
+
+    Файл удаляется после фиксации транзакции и только если на него
+    не ссылается ни один другой документ."""
+    shared = False
+    if document.sha256:
+        shared = session.query(Document.id).filter(
+            Document.sha256 == document.sha256, Document.id != document.id
+        ).first() is not None
+    
+    session.delete(document)
+    if not shared:
+        _release_files(session, [document.file_path])
+
+def release_contract_files(session, contract_id):
+    """Готовит к удалению файлы документов договора перед удалением самого договора.
+
+    Строки документов удаляет база (каскадом вместе с договором); здесь одним
+    запросом выбираются файлы, на которые не ссылаются документы других
+    договоров. Файлы удаляются после фиксации транзакции."""
+    other = aliased(Document)
+    file_paths = session.execute(
+        select(Document.file_path.distinct()).where(
+            Document.contract_id == contract_id,
+            ~exists().where(other.sha256 == Document.sha256,
+                            other.contract_id.is_distinct_from(contract_id)))
+    ).scalars().all()
+    _release_files(session, file_paths)
+
+def _release_files(session, file_paths):
+    """Отмечает файлы к удалению после фиксации, кроме файлов документов архива"""
+    from .archive import archived_files
+
+    kept = archived_files(session.get_bind(), file_paths)
+    session.info.setdefault('released_files', []).extend(
+        file_path for file_path in file_paths if file_path not in kept)
+
+def remove_file(file_path):
+    """Удаляет файл с диска"""
+    if os.path.exists(file_path):
+        os.remove(file_path)
+        return True
+    return False
+
+def _remove_released_files(session):
+    for file_path in session.info.pop('released_files', []):
+        try:
+            remove_file(file_path)
+        except OSError:
+            pass
+
+def _keep_released_files(session):
+    session.info.pop('released_files', None)
+
+def listen_sessions(factory):
+    """Удаление освобожденных файлов после фиксации сессий фабрики factory"""
+    event.listen(factory, 'after_commit', _remove_released_files)
+    event.listen(factory, 'after_rollback', _keep_released_files)
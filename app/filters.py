@@ -0,0 +1,86 @@
+"""Отбор и сортировка договоров на стороне базы данных.
+
+Все условия сводятся к диапазонам по индексированным колонкам,
+поэтому фильтр превращается в один запрос по индексу, а модель
+таблицы подгружает результат постранично.
+"""
+from datetime import date, timedelta
+from .models import Contract
+from .normalize import search_key
+from .search import search_criteria
+
+# Состояние договора по сроку (как в строке состояния: активен, пока не наступила дата окончания)
+STATUS_ALL, STATUS_ACTIVE, STATUS_EXPIRED = 'all', 'active', 'expired'
+STATUSES = {
+    STATUS_ALL: "Все",
+    STATUS_ACTIVE: "Действующие",
+    STATUS_EXPIRED: "Истекшие",
+}
+
+# Интервалы "дней осталось": код -> (название, от, до); None - без ограничения
+DAYS_BUCKETS = {
+    'week': ("До 7 дней", 0, 7),
+    'month': ("8-30 дней", 8, 30),
+    'quarter': ("31-90 дней", 31, 90),
+    'later': ("Больше 90 дней", 91, None),
+}
+
+# Колонки таблицы, по которым можно сортировать (колонка "Осталось" - это дата окончания)
+SORT_COLUMNS = [
+    Contract.number, Contract.name, Contract.counterparty,
+    Contract.start_date, Contract.end_date, Contract.end_date,
+]
+DEFAULT_SORT_COLUMN = 4
+
+
+class ContractFilter:
+    """Набор условий отбора договоров; пустые поля не ограничивают выборку"""
+
+    def __init__(self, text="", start_from=None, start_to=None, end_from=None, end_to=None,
+                 status=STATUS_ALL, counterparty="", days_bucket=None):
+        self.text = text
+        self.start_from = start_from
+        self.start_to = start_to
+        self.end_from = end_from
+        self.end_to = end_to
+        self.status = status
+        self.counterparty = counterparty
+        self.days_bucket = days_bucket
+
+    def is_empty(self):
+        return not (self.text.strip() or self.start_from or self.start_to or self.end_from
+                    or self.end_to or self.status != STATUS_ALL
+                    or self.counterparty.strip() or self.days_bucket)
+
+    def criteria(self, session, today=None, include_archive=False):
+        """Условия для query.filter(*criteria); include_archive - для таблицы с архивом"""
+        today = today or date.today()
+        criteria = search_criteria(session, self.text, include_archive)
+
+        if self.start_from:
+            criteria.append(Contract.start_date >= self.start_from)
+        if self.start_to:
+            criteria.append(Contract.start_date <= self.start_to)
+        if self.end_from:
+            criteria.append(Contract.end_date >= self.end_from)
+        if self.end_to:
+            criteria.append(Contract.end_date <= self.end_to)
+
+        if self.status == STATUS_ACTIVE:
+            criteria.append(Contract.end_date >= today)
+        elif self.status == STATUS_EXPIRED:
+            criteria.append(Contract.end_date < today)
+
+        if self.days_bucket:
+            _, low, high = DAYS_BUCKETS[self.days_bucket]
+            criteria.append(Contract.end_date >= today + timedelta(days=low))
+            if high is not None:
+                criteria.append(Contract.end_date <= today + timedelta(days=high))
+
+        prefix = search_key(self.counterparty)
+        if prefix:
+            # Начало ключа контрагента (без формы собственности, кавычек и регистра).
+            # Диапазон вместо LIKE 'префикс%': так SQLite использует индекс по ключу
+            criteria.append(Contract.counterparty_key >= prefix)
+            criteria.append(Contract.counterparty_key < prefix + '\U0010ffff')
+        return criteria
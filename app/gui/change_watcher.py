@@ -0,0 +1,47 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+from ..changes import ChangeTracker
+
+# Как часто проверять базу, мс
+POLL_INTERVAL = 2000
+
+
+class ChangeWatcher(QObject):
+    """Периодически проверяет журнал изменений и сообщает о новых записях.
+
+    Проверка без изменений - один PRAGMA data_version, поэтому ее можно
+    выполнять часто даже для базы на сетевом диске."""
+
+    # ChangeSet - см. changes.read_changes
+    changed = Signal(object)
+
+    def __init__(self, engine, parent=None, interval=POLL_INTERVAL):
+        super().__init__(parent)
+        self._engine = engine
+        self._tracker = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.poll)
+
+    def start(self):
+        # Журнал изменений ведется триггерами SQLite
+        if self._engine.dialect.name != 'sqlite':
+            return
+        self._tracker = ChangeTracker(self._engine)
+        self._tracker.start()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        if self._tracker is not None:
+            self._tracker.close()
+            self._tracker = None
+
+    def sync(self):
+        """Отмечает все изменения обработанными (после полной перезагрузки таблицы)"""
+        if self._tracker is not None:
+            self._tracker.sync()
+
+    def poll(self):
+        changes = self._tracker.poll()
+        if changes is not None:
+            self.changed.emit(changes)
@@ -0,0 +1,89 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QGroupBox, QLabel, QSpinBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QDialogButtonBox
+)
+from PySide6.QtCore import Qt
+
+from ..database import session_scope
+from ..statistics import get_statistics, EXPIRING_DAYS
+
+MONTH_NAMES = ["январь", "февраль", "март", "апрель", "май", "июнь", "июль",
+               "август", "сентябрь", "октябрь", "ноябрь", "декабрь"]
+
+
+def _month_title(month):
+    """'2025-03' -> 'март 2025'"""
+    year, number = month.split('-')
+    return f"{MONTH_NAMES[int(number) - 1]} {year}"
+
+
+def _table(headers, rows):
+    table = QTableWidget(len(rows), len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+    table.verticalHeader().setVisible(False)
+    for row, values in enumerate(rows):
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(str(value))
+            if column > 0:
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            table.setItem(row, column, item)
+    return table
+
+
+class DashboardDialog(QDialog):
+    """Сводка по договорам: итоги, крупнейшие контрагенты, окончания по месяцам"""
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Сводка по договорам")
+        self.resize(800, 550)
+        self.engine = engine
+
+        layout = QVBoxLayout()
+
+        summary = QGroupBox("Итоги")
+        form = QFormLayout()
+        self.total_label = QLabel()
+        self.active_label = QLabel()
+        self.expired_label = QLabel()
+        self.expiring_label = QLabel()
+        self.days_spin = QSpinBox()
+        self.days_spin.setRange(1, 365)
+        self.days_spin.setValue(EXPIRING_DAYS)
+        self.days_spin.setSuffix(" дней")
+        self.days_spin.valueChanged.connect(self.refresh)
+        form.addRow("Всего договоров:", self.total_label)
+        form.addRow("Активных:", self.active_label)
+        form.addRow("Истекших:", self.expired_label)
+        form.addRow("Срок проверки:", self.days_spin)
+        form.addRow("Истекают в этот срок:", self.expiring_label)
+        summary.setLayout(form)
+        layout.addWidget(summary)
+
+        self.tables_layout = QHBoxLayout()
+        layout.addLayout(self.tables_layout, 1)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+        self.refresh()
+
+    def refresh(self):
+        with session_scope(self.engine) as session:
+            stats = get_statistics(session, self.days_spin.value())
+        self.total_label.setText(str(stats.total))
+        self.active_label.setText(str(stats.active))
+        self.expired_label.setText(str(stats.expired))
+        self.expiring_label.setText(str(stats.expiring))
+
+        while self.tables_layout.count():
+            self.tables_layout.takeAt(0).widget().deleteLater()
+        self.tables_layout.addWidget(_table(
+            ["Контрагент", "Всего", "Активных"], stats.by_counterparty))
+        self.tables_layout.addWidget(_table(
+            ["Месяц окончания", "Договоров"],
+            [(_month_title(month), count) for month, count in stats.by_month]))
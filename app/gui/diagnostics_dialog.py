@@ -0,0 +1,108 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, QTableWidget, QTableWidgetItem,
+    QHeaderView, QPushButton, QCheckBox, QLabel
+)
+from PySide6.QtCore import Qt, QTimer
+
+from .. import diagnostics
+
+# Роли, которые представление запрашивает у модели таблицы
+ROLE_NAMES = {int(role): role.name for role in (
+    Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole, Qt.ItemDataRole.TextAlignmentRole,
+    Qt.ItemDataRole.BackgroundRole, Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.FontRole,
+    Qt.ItemDataRole.ToolTipRole, Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.SizeHintRole,
+    Qt.ItemDataRole.CheckStateRole, Qt.ItemDataRole.StatusTipRole, Qt.ItemDataRole.WhatsThisRole,
+)}
+
+STATS_HEADERS = ["Количество", "Всего, мс", "Среднее, мс", "Максимум, мс"]
+
+
+def _table(headers):
+    table = QTableWidget(0, len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+    table.verticalHeader().setVisible(False)
+    return table
+
+
+def _fill(table, rows):
+    table.setRowCount(len(rows))
+    for row, values in enumerate(rows):
+        for column, value in enumerate(values):
+            text = f"{value:.2f}" if isinstance(value, float) else str(value)
+            item = QTableWidgetItem(text)
+            if column > 0:
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            if column == 0:
+                item.setToolTip(text)
+            table.setItem(row, column, item)
+
+
+class DiagnosticsDialog(QDialog):
+    """Скрытая панель "Диагностика" (Ctrl+Shift+D): статистика запросов и операций"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Диагностика")
+        self.resize(900, 500)
+
+        layout = QVBoxLayout()
+
+        controls = QHBoxLayout()
+        self.enabled_check = QCheckBox("Сбор включен")
+        self.enabled_check.setChecked(diagnostics.enabled)
+        self.enabled_check.toggled.connect(self.toggle)
+        refresh_button = QPushButton("Обновить")
+        refresh_button.clicked.connect(self.refresh)
+        reset_button = QPushButton("Сбросить")
+        reset_button.clicked.connect(self.reset)
+        controls.addWidget(self.enabled_check)
+        controls.addStretch()
+        controls.addWidget(refresh_button)
+        controls.addWidget(reset_button)
+        layout.addLayout(controls)
+
+        self.tabs = QTabWidget()
+        self.queries_table = _table(["Запрос"] + STATS_HEADERS)
+        self.slowest_table = _table(["Запрос", "Время, мс", "Параметры"])
+        self.timers_table = _table(["Операция"] + STATS_HEADERS)
+        self.roles_table = _table(["Роль", "Вызовов data()"])
+        self.tabs.addTab(self.queries_table, "Запросы")
+        self.tabs.addTab(self.slowest_table, "Медленные запросы")
+        self.tabs.addTab(self.timers_table, "Операции")
+        self.tabs.addTab(self.roles_table, "Модель таблицы")
+        layout.addWidget(self.tabs)
+
+        self.log_label = QLabel()
+        layout.addWidget(self.log_label)
+        self.setLayout(layout)
+
+        # Пока панель открыта, данные обновляются раз в секунду
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def toggle(self, checked):
+        if checked:
+            diagnostics.enable()
+        else:
+            diagnostics.disable()
+        self.refresh()
+
+    def reset(self):
+        diagnostics.reset()
+        self.refresh()
+
+    def refresh(self):
+        data = diagnostics.snapshot()
+        _fill(self.queries_table, data["queries"])
+        _fill(self.slowest_table, [(shape, ms, params) for ms, shape, params in data["slowest"]])
+        _fill(self.timers_table, data["timers"])
+        _fill(self.roles_table, sorted(
+            ((ROLE_NAMES.get(int(role), str(role)), count) for role, count in data["roles"].items()),
+            key=lambda row: row[1], reverse=True))
+        log_path = diagnostics.log_path()
+        self.log_label.setText(f"Журнал: {log_path}" if log_path else
+                               "Журнал не ведется (задайте CONTRACTS_DIAGNOSTICS_LOG)")
@@ -0,0 +1,75 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+    QTableWidget, QTableWidgetItem, QHeaderView, QDialogButtonBox
+)
+from PySide6.QtCore import Signal
+
+from ..database import session_scope
+from ..document_index import search_documents, count_unindexed
+
+# Сколько найденных документов показывать
+RESULT_LIMIT = 200
+
+
+class DocumentSearchDialog(QDialog):
+    """Поиск по тексту прикрепленных PDF: договор, файл и фрагмент с совпадением"""
+
+    # id договора, выбранного двойным щелчком
+    contract_selected = Signal(int)
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Поиск в документах")
+        self.resize(900, 500)
+        self.engine = engine
+        self.matches = []
+
+        layout = QVBoxLayout()
+
+        search_layout = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Слова из текста договора, например: штрафные санкции")
+        self.search_edit.returnPressed.connect(self.search)
+        search_button = QPushButton("Найти")
+        search_button.clicked.connect(self.search)
+        search_layout.addWidget(self.search_edit)
+        search_layout.addWidget(search_button)
+        layout.addLayout(search_layout)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["Договор", "Контрагент", "Файл", "Фрагмент"])
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.cellDoubleClicked.connect(self.select_contract)
+        layout.addWidget(self.table, 1)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def search(self):
+        with session_scope(self.engine) as session:
+            self.matches = search_documents(session, self.search_edit.text(), RESULT_LIMIT)
+            unindexed = count_unindexed(session)
+        self.table.setRowCount(len(self.matches))
+        for row, match in enumerate(self.matches):
+            values = (match.number, match.counterparty, match.file_name,
+                      " ".join(match.snippet.split()))
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+        status = f"Найдено документов: {len(self.matches)}"
+        if len(self.matches) == RESULT_LIMIT:
+            status += " (показаны первые)"
+        if unindexed:
+            status += f" | Еще не проиндексировано: {unindexed}"
+        self.status_label.setText(status)
+
+    def select_contract(self, row, column):
+        self.contract_selected.emit(self.matches[row].contract_id)
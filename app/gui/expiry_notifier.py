@@ -0,0 +1,45 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+from ..database import session_scope
+from ..scheduler import ExpiryScheduler, seconds_until
+
+
+class ExpiryNotifier(QObject):
+    """Планировщик уведомлений внутри Qt: таймер срабатывает только к следующему порогу"""
+
+    # Список (договор, порог, дней осталось) - см. ExpiryScheduler.due
+    notified = Signal(list)
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self._engine = engine
+        self._scheduler = ExpiryScheduler()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.check)
+
+    def start(self):
+        """Загружает окно договоров и проверяет наступившие пороги"""
+        with session_scope(self._engine) as session:
+            self._scheduler.load(session)
+        self.check()
+
+    def check(self):
+        """Отправляет наступившие уведомления и заводит таймер до следующего порога"""
+        with session_scope(self._engine) as session:
+            notifications = self._scheduler.due(session)
+        if notifications:
+            self.notified.emit(notifications)
+        self._timer.start(int(seconds_until(self._scheduler.next_wakeup()) * 1000))
+
+    def contract_changed(self, contract):
+        self._scheduler.contract_changed(contract)
+        self.check()
+
+    def contract_removed(self, contract_id):
+        self._scheduler.contract_removed(contract_id)
+
+    def apply_changes(self, changes):
+        """Учитывает изменения, сделанные другими копиями программы (changes.ChangeSet)"""
+        with session_scope(self._engine) as session:
+            self._scheduler.apply_changes(session, changes)
+        self.check()
@@ -0,0 +1,114 @@
+from PySide6.QtWidgets import (
+    QWidget, QHBoxLayout, QGridLayout, QLabel, QDateEdit, QComboBox, QLineEdit, QPushButton
+)
+from PySide6.QtCore import QDate, Signal
+
+from ..filters import ContractFilter, STATUSES, STATUS_ALL, DAYS_BUCKETS
+
+# Минимальная дата поля означает "не задано"
+NO_DATE = QDate(1900, 1, 1)
+
+
+class OptionalDateEdit(QDateEdit):
+    """Поле даты, которое можно оставить пустым"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setCalendarPopup(True)
+        self.setDisplayFormat("dd.MM.yyyy")
+        self.setMinimumDate(NO_DATE)
+        self.setSpecialValueText(" ")
+        self.clear_date()
+
+    def clear_date(self):
+        self.setDate(NO_DATE)
+
+    def value(self):
+        """Выбранная дата (datetime.date) или None"""
+        if self.date() == NO_DATE:
+            return None
+        return self.date().toPython()
+
+
+class FilterPanel(QWidget):
+    """Панель отбора договоров: даты, состояние, контрагент, остаток дней"""
+
+    changed = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QGridLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.start_from = OptionalDateEdit()
+        self.start_to = OptionalDateEdit()
+        self.end_from = OptionalDateEdit()
+        self.end_to = OptionalDateEdit()
+
+        self.status_combo = QComboBox()
+        for code, title in STATUSES.items():
+            self.status_combo.addItem(title, code)
+
+        self.days_combo = QComboBox()
+        self.days_combo.addItem("Любой", None)
+        for code, (title, _, _) in DAYS_BUCKETS.items():
+            self.days_combo.addItem(title, code)
+
+        self.counterparty_edit = QLineEdit()
+        self.counterparty_edit.setPlaceholderText("Начало названия, например Ромашка")
+        self.counterparty_edit.setClearButtonEnabled(True)
+
+        reset_button = QPushButton("Сбросить")
+        reset_button.clicked.connect(self.reset)
+
+        layout.addWidget(QLabel("Начало с"), 0, 0)
+        layout.addLayout(self._range(self.start_from, self.start_to), 0, 1)
+        layout.addWidget(QLabel("Окончание с"), 1, 0)
+        layout.addLayout(self._range(self.end_from, self.end_to), 1, 1)
+        layout.addWidget(QLabel("Состояние"), 0, 2)
+        layout.addWidget(self.status_combo, 0, 3)
+        layout.addWidget(QLabel("Осталось"), 1, 2)
+        layout.addWidget(self.days_combo, 1, 3)
+        layout.addWidget(QLabel("Контрагент"), 0, 4)
+        layout.addWidget(self.counterparty_edit, 0, 5)
+        layout.addWidget(reset_button, 1, 5)
+        layout.setColumnStretch(5, 1)
+        self.setLayout(layout)
+
+        for edit in (self.start_from, self.start_to, self.end_from, self.end_to):
+            edit.dateChanged.connect(self.changed)
+        self.status_combo.currentIndexChanged.connect(self.changed)
+        self.days_combo.currentIndexChanged.connect(self.changed)
+        self.counterparty_edit.textChanged.connect(self.changed)
+
+    @staticmethod
+    def _range(date_from, date_to):
+        layout = QHBoxLayout()
+        layout.addWidget(date_from)
+        layout.addWidget(QLabel("по"))
+        layout.addWidget(date_to)
+        return layout
+
+    def reset(self):
+        """Очищает все условия (сигнал changed отправляется один раз)"""
+        self.blockSignals(True)
+        for edit in (self.start_from, self.start_to, self.end_from, self.end_to):
+            edit.clear_date()
+        self.status_combo.setCurrentIndex(0)
+        self.days_combo.setCurrentIndex(0)
+        self.counterparty_edit.clear()
+        self.blockSignals(False)
+        self.changed.emit()
+
+    def contract_filter(self, text=""):
+        """Условия панели вместе со строкой поиска"""
+        return ContractFilter(
+            text=text,
+            start_from=self.start_from.value(),
+            start_to=self.start_to.value(),
+            end_from=self.end_from.value(),
+            end_to=self.end_to.value(),
+            status=self.status_combo.currentData() or STATUS_ALL,
+            counterparty=self.counterparty_edit.text(),
+            days_bucket=self.days_combo.currentData(),
+        )
@@ -0,0 +1,160 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+from PySide6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QPushButton
+)
+from ..database import get_session
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+
+class JobSignals(QObject):
+    """Сигналы фоновой задачи (доставляются в главный поток)"""
+    progress = Signal(int, int)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class Job(QRunnable):
+    """Фоновая задача: func(job, session, *args) выполняется в пуле потоков.
+
+    Задача получает собственную сессию базы данных и сообщает о ходе работы
+    через job.report(); после отмены report() прерывает задачу."""
+
+    def __init__(self, title, engine, func, *args):
+        super().__init__()
+        # Объект задачи живет, пока его держит JobManager
+        self.setAutoDelete(False)
+        self.title = title
+        self.signals = JobSignals()
+        self._engine = engine
+        self._func = func
+        self._args = args
+        self._cancelled = False
+
+    def run(self):
+        session = get_session(self._engine)
+        try:
+            result = self._func(self, session, *self._args)
+        except JobCancelled:
+            session.rollback()
+            self.signals.cancelled.emit()
+        except Exception as e:
+            session.rollback()
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            session.close()
+
+    def report(self, done, total=0):
+        """Сообщает о прогрессе; вызывает JobCancelled, если задачу отменили"""
+        if self._cancelled:
+            raise JobCancelled()
+        self.signals.progress.emit(done, total)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+
+class JobRow(QWidget):
+    """Строка панели задач: название, прогресс, кнопка отмены"""
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout()
+        layout.setContentsMargins(4, 2, 4, 2)
+
+        self.label = QLabel(job.title)
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)
+        self.cancel_button = QPushButton("Отмена")
+        self.cancel_button.clicked.connect(job.cancel)
+        self.cancel_button.clicked.connect(lambda: self.cancel_button.setEnabled(False))
+
+        layout.addWidget(self.label)
+        layout.addWidget(self.progress, 1)
+        layout.addWidget(self.cancel_button)
+        self.setLayout(layout)
+
+        job.signals.progress.connect(self.set_progress)
+
+    def set_progress(self, done, total):
+        if total > 0:
+            self.progress.setRange(0, total)
+            self.progress.setValue(min(done, total))
+        else:
+            self.progress.setRange(0, 0)
+
+    def finish(self, text):
+        self.progress.setRange(0, 1)
+        self.progress.setValue(1)
+        self.progress.setFormat(text)
+        self.cancel_button.setEnabled(False)
+
+
+class JobManager(QObject):
+    """Запускает фоновые задачи и показывает их в панели"""
+
+    def __init__(self, engine, parent_window):
+        super().__init__(parent_window)
+        self._engine = engine
+        self._pool = QThreadPool.globalInstance()
+        self._jobs = set()
+
+        self.panel = QDockWidget("Фоновые задачи", parent_window)
+        self.panel.setObjectName("jobs_panel")
+        container = QWidget()
+        self._rows_layout = QVBoxLayout()
+        self._rows_layout.addStretch()
+        container.setLayout(self._rows_layout)
+        self.panel.setWidget(container)
+        self.panel.hide()
+
+    def submit(self, title, func, *args, on_finished=None, on_failed=None, on_cancelled=None):
+        """Запускает func(job, session, *args) в фоне.
+
+        Обработчики результата вызываются в главном потоке."""
+        job = Job(title, self._engine, func, *args)
+        row = JobRow(job)
+        self._rows_layout.insertWidget(self._rows_layout.count() - 1, row)
+        self.panel.show()
+        self._jobs.add(job)
+
+        def done(text):
+            row.finish(text)
+            self._jobs.discard(job)
+            # Завершенная строка остается на панели несколько секунд
+            QTimer.singleShot(3000, lambda: self._remove_row(row))
+
+        job.signals.finished.connect(lambda result: done("Готово"))
+        job.signals.failed.connect(lambda message: done("Ошибка"))
+        job.signals.cancelled.connect(lambda: done("Отменено"))
+        if on_finished:
+            job.signals.finished.connect(on_finished)
+        if on_failed:
+            job.signals.failed.connect(on_failed)
+        if on_cancelled:
+            job.signals.cancelled.connect(on_cancelled)
+
+        self._pool.start(job)
+        return job
+
+    def _remove_row(self, row):
+        self._rows_layout.removeWidget(row)
+        row.deleteLater()
+        if not self._jobs and self._rows_layout.count() == 1:
+            self.panel.hide()
+
+    def cancel_all(self):
+        for job in list(self._jobs):
+            job.cancel()
+
+    def wait(self, msecs=-1):
+        """Ждет завершения всех задач (например, при закрытии окна)"""
+        return self._pool.waitForDone(msecs)
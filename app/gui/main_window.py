@@ -1,393 +1,771 @@
-import os
-from datetime import date
-from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QTableView, QHeaderView, 
-    QPushButton, QHBoxLayout, QMessageBox, QInputDialog, QLabel,
-    QMenu
-)
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QAction
-
-from ..database import get_session
-from ..models import Contract
-from ..notifications import check_expiring_contracts
-from .table_model import ContractsTableModel
-from .contract_form import ContractForm
-from .excel_utils import export_to_excel, import_from_excel
-
-class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Управление договорами 1.0")
-        self.resize(1200, 700)
-        
-        self.session = get_session()
-        self.setup_ui()
-        self.setup_menu()
-        self.load_contracts()
-    
-    def setup_ui(self):
-        """Настройка интерфейса"""
-        central_widget = QWidget()
-        layout = QVBoxLayout()
-        
-        # Кнопки управления
-        button_layout = QHBoxLayout()
-        
-        self.add_button = QPushButton("Добавить")
-        self.add_button.clicked.connect(self.add_contract)
-        
-        self.edit_button = QPushButton("Редактировать")
-        self.edit_button.clicked.connect(self.edit_contract)
-        
-        self.delete_button = QPushButton("Удалить")
-        self.delete_button.clicked.connect(self.delete_contract)
-        
-        self.search_button = QPushButton("Поиск")
-        self.search_button.clicked.connect(self.search_contracts)
-        
-        self.refresh_button = QPushButton("Обновить")
-        self.refresh_button.clicked.connect(self.load_contracts)
-        
-        button_layout.addWidget(self.add_button)
-        button_layout.addWidget(self.edit_button)
-        button_layout.addWidget(self.delete_button)
-        button_layout.addWidget(self.search_button)
-        button_layout.addWidget(self.refresh_button)
-        
-        # Таблица договоров
-        self.table = QTableView()
-        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
-        self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.table.verticalHeader().setVisible(False)
-        self.table.doubleClicked.connect(self.edit_contract)
-        
-        # Включение контекстного меню
-        self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.table.customContextMenuRequested.connect(self.show_context_menu)
-        
-        # Статус бар
-        self.status_label = QLabel()
-        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        layout.addLayout(button_layout)
-        layout.addWidget(self.table)
-        layout.addWidget(self.status_label)
-        central_widget.setLayout(layout)
-        self.setCentralWidget(central_widget)
-    
-    def setup_menu(self):
-        """Настройка меню"""
-        menubar = self.menuBar()
-        
-        # Меню Файл
-        file_menu = menubar.addMenu("Файл")
-        
-        export_action = QAction("Экспорт в Excel", self)
-        export_action.triggered.connect(self.export_excel)
-        file_menu.addAction(export_action)
-        
-        import_action = QAction("Импорт из Excel", self)
-        import_action.triggered.connect(self.import_excel)
-        file_menu.addAction(import_action)
-        
-        file_menu.addSeparator()
-        
-        exit_action = QAction("Выход", self)
-        exit_action.triggered.connect(self.close)
-        file_menu.addAction(exit_action)
-        
-        # Меню Действия
-        action_menu = menubar.addMenu("Действия")
-        
-        check_expiring_action = QAction("Проверить истекающие", self)
-        check_expiring_action.triggered.connect(self.check_expiring)
-        action_menu.addAction(check_expiring_action)
-        
-        # Меню Помощь
-        help_menu = menubar.addMenu("Помощь")
-        
-        about_action = QAction("О программе", self)
-        about_action.triggered.connect(self.show_about)
-        help_menu.addAction(about_action)
-        
-        license_action = QAction("Лицензия", self)
-        license_action.triggered.connect(self.show_license)
-        help_menu.addAction(license_action)
-    
-    def show_about(self):
-        """Показывает информацию о программе"""
-        about_text = """<b>Управление договорами</b><br><br>
-        Версия 1.0<br>
-        Программа для учета и управления договорами<br><br>
-        © 2025 Иван Пожидаев. Все права защищены."""
-        QMessageBox.about(self, "О программе", about_text)
-    
-    def show_license(self):
-        """Показывает лицензионное соглашение"""
-        license_text = """<b>Лицензия MIT</b><br><br>
-        Copyright (c) 2025 Иван Пожидаев<br>
-        E-mail: ivan@ivanpozhidaev.ru<br><br>
-        Эта программа распространяется под лицензией MIT. Разрешается использование, копирование
-        и распространение этой программы в любых целях, при условии указания авторства. <br>"""
-        QMessageBox.information(self, "Лицензия", license_text)
-    
-    def show_context_menu(self, position):
-        """Показывает контекстное меню для таблицы"""
-        menu = QMenu()
-        
-        export_action = QAction("Экспорт выделенного", self)
-        export_action.triggered.connect(self.export_selected)
-        menu.addAction(export_action)
-        
-        view_doc_action = QAction("Просмотреть документ", self)
-        view_doc_action.triggered.connect(self.view_document)
-        menu.addAction(view_doc_action)
-        
-        menu.exec(self.table.viewport().mapToGlobal(position))
-    
-    def load_contracts(self):
-        """Загрузка договоров в таблицу"""
-        contracts = self.session.query(Contract).order_by(Contract.end_date).all()
-        
-        headers = ["Номер", "Наименование", "Контрагент", "Начало", "Окончание", "Осталось"]
-        self.model = ContractsTableModel(contracts, headers)
-        self.table.setModel(self.model)
-        
-        # Обновление статус бара
-        today = date.today()
-        active = sum(1 for c in contracts if c.end_date >= today)
-        expired = len(contracts) - active
-        self.status_label.setText(
-            f"Всего договоров: {len(contracts)} | Активных: {active} | Истекших: {expired}")
-    
-    def export_excel(self):
-        """Экспорт всех договоров в Excel"""
-        contracts = self.session.query(Contract).all()
-        if not contracts:
-            QMessageBox.warning(self, "Внимание", "Нет договоров для экспорта!")
-            return
-        
-        success, message = export_to_excel(contracts, self)
-        if success:
-            QMessageBox.information(self, "Успех", message)
-        else:
-            QMessageBox.warning(self, "Ошибка", message)
-    
-    def export_selected(self):
-        """Экспорт выбранных договоров в Excel"""
-        contracts = self.get_selected_contracts()
-        if not contracts:
-            QMessageBox.warning(self, "Внимание", "Выберите договоры для экспорта!")
-            return
-        
-        success, message = export_to_excel(contracts, self)
-        if success:
-            QMessageBox.information(self, "Успех", message)
-        else:
-            QMessageBox.warning(self, "Ошибка", message)
-    
-    def import_excel(self):
-        """Импорт договоров из Excel"""
-        reply = QMessageBox.question(
-            self, "Подтверждение",
-            "Вы уверены, что хотите импортировать договоры из Excel?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-        )
-        
-        if reply == QMessageBox.StandardButton.Yes:
-            success, message = import_from_excel(self.session, self)
-            if success:
-                QMessageBox.information(self, "Успех", message)
-                self.load_contracts()
-            else:
-                QMessageBox.warning(self, "Ошибка", message)
-    
-    def get_selected_contracts(self):
-        """Возвращает список выбранных договоров"""
-        indexes = self.table.selectionModel().selectedRows()
-        if not indexes:
-            return []
-        
-        return [self.model._data[index.row()] for index in indexes]
-    
-    def add_contract(self):
-        """Добавление нового договора"""
-        form = ContractForm()
-        if form.exec():
-            data = form.get_data()
-        
-            try:
-                contract = Contract(
-                    number=data['number'],
-                    name=data['name'],
-                    counterparty=data['counterparty'],
-                    start_date=data['start_date'],
-                    end_date=data['end_date'],
-                    description=data['description']
-                )
-            
-                self.session.add(contract)
-                self.session.commit()  # Сначала сохраняем договор, чтобы получить ID
-            
-                # Прикрепление документа, если есть
-                if data['file_path']:
-                    self.attach_document(contract, data['file_path'])
-                    self.session.commit()  # Сохраняем документ
-            
-                self.load_contracts()
-                QMessageBox.information(self, "Успех", "Договор успешно добавлен!")
-        
-            except Exception as e:
-                self.session.rollback()
-                QMessageBox.critical(self, "Ошибка", f"Не удалось добавить договор: {str(e)}")
-    
-    def edit_contract(self):
-        """Редактирование договора"""
-        contract = self.get_selected_contract()
-        if not contract:
-            return
-    
-        form = ContractForm(contract)
-        if form.exec():
-            data = form.get_data()
-        
-            try:
-                contract.number = data['number']
-                contract.name = data['name']
-                contract.counterparty = data['counterparty']
-                contract.start_date = data['start_date']
-                contract.end_date = data['end_date']
-                contract.description = data['description']
-            
-                # Проверяем, был ли выбран новый файл
-                if data['file_path']:
-                    # Если у договора уже есть документ
-                    if contract.documents:
-                        current_file = contract.documents[0].file_path
-                        # Если выбран другой файл
-                        if data['file_path'] != current_file:
-                            from ..file_manager import delete_document
-                            delete_document(current_file)
-                            self.session.delete(contract.documents[0])
-                            self.attach_document(contract, data['file_path'])
-                    else:
-                        # Если документа не было, просто прикрепляем новый
-                        self.attach_document(contract, data['file_path'])
-            
-                self.session.commit()
-                self.load_contracts()
-                QMessageBox.information(self, "Успех", "Договор успешно обновлен!")
-        
-            except Exception as e:
-                self.session.rollback()
-                QMessageBox.critical(self, "Ошибка", f"Не удалось обновить договор: {str(e)}")
-    
-    def delete_contract(self):
-        """Удаление договора"""
-        contract = self.get_selected_contract()
-        if not contract:
-            return
-        
-        reply = QMessageBox.question(
-            self, "Подтверждение",
-            f"Вы уверены, что хотите удалить договор {contract.number}?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-        )
-        
-        if reply == QMessageBox.StandardButton.Yes:
-            try:
-                # Удаление связанных документов
-                if contract.documents:
-                    from ..file_manager import delete_document
-                    delete_document(contract.documents[0].file_path)
-                
-                self.session.delete(contract)
-                self.session.commit()
-                self.load_contracts()
-                QMessageBox.information(self, "Успех", "Договор успешно удален!")
-            
-            except Exception as e:
-                self.session.rollback()
-                QMessageBox.critical(self, "Ошибка", f"Не удалось удалить договор: {str(e)}")
-    
-    def get_selected_contract(self):
-        """Возвращает выбранный в таблице договор"""
-        indexes = self.table.selectionModel().selectedRows()
-        if not indexes:
-            QMessageBox.warning(self, "Внимание", "Выберите договор из таблицы!")
-            return None
-        
-        return self.model._data[indexes[0].row()]
-    
-    def search_contracts(self):
-        """Поиск договоров"""
-        text, ok = QInputDialog.getText(
-            self, "Поиск договоров", "Введите номер, название или контрагента:")
-        
-        if ok and text:
-            contracts = self.session.query(Contract).filter(
-                (Contract.number.ilike(f"%{text}%")) |
-                (Contract.name.ilike(f"%{text}%")) |
-                (Contract.counterparty.ilike(f"%{text}%"))
-            ).order_by(Contract.end_date).all()
-            
-            self.load_contracts(contracts)
-    
-    def attach_document(self, contract, file_path):
-        """Прикрепление документа к договору"""
-        from ..file_manager import save_document
-        from ..models import Document
-        
-        try:
-            with open(file_path, 'rb') as file_obj:
-                file_name, saved_path = save_document(file_obj, contract.number)
-                
-                document = Document(
-                    contract_id=contract.id,
-                    file_name=file_name,
-                    file_path=saved_path
-                )
-                
-                self.session.add(document)
-                self.session.commit()
-        
-        except Exception as e:
-            raise Exception(f"Ошибка при загрузке файла: {str(e)}")
-    
-    def view_document(self):
-        """Просмотр прикрепленного документа"""
-        contract = self.get_selected_contract()
-        if not contract:
-            return
-        
-        if not contract.documents:
-            QMessageBox.information(self, "Информация", "Нет прикрепленных документов")
-            return
-        
-        try:
-            os.startfile(contract.documents[0].file_path)
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Не удалось открыть файл: {str(e)}")
-    
-    def check_expiring(self):
-        """Проверка истекающих договоров"""
-        expiring = check_expiring_contracts(self.session)
-        if expiring:
-            msg = "Следующие договоры скоро истекают:\n\n"
-            msg += "\n".join(
-                f"- {c.number} ({c.counterparty}): {c.end_date.strftime('%d.%m.%Y')} "
-                f"(осталось {(c.end_date - date.today()).days} дней)"
-                for c in expiring
-            )
-            
-            QMessageBox.warning(self, "Внимание", msg)
-        else:
-            QMessageBox.information(self, "Информация", "Нет договоров, которые скоро истекают")
-    
-    def closeEvent(self, event):
-        """Закрытие приложения"""
-        self.session.close()
-        event.accept()
+import os
+from datetime import date
+from PySide6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QTableView, QHeaderView, 
+    QPushButton, QHBoxLayout, QMessageBox, QLabel, QLineEdit,
+    QMenu
+)
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QAction, QKeySequence, QShortcut
+from sqlalchemy.orm.exc import StaleDataError
+
+from .. import diagnostics
+from ..database import get_session, optimize
+from ..models import Contract
+from ..notifications import check_expiring_contracts
+from ..filters import ContractFilter, DEFAULT_SORT_COLUMN
+from ..statistics import get_statistics, invalidate as invalidate_statistics
+from .table_model import ContractsTableModel
+from .contract_form import ContractForm
+from .filter_panel import FilterPanel
+from .jobs import JobManager
+from .expiry_notifier import ExpiryNotifier
+from .change_watcher import ChangeWatcher
+
+def store_document(job, session, contract_id, file_path):
+    """Фоновая задача: сохраняет PDF в хранилище документов и записывает его в базу"""
+    from ..file_manager import save_document
+    from ..models import Document
+    
+    sha256, saved_path = save_document(file_path)
+    file_name = os.path.basename(file_path)
+    session.add(Document(
+        contract_id=contract_id, file_name=file_name, file_path=saved_path, sha256=sha256,
+        file_size=os.path.getsize(saved_path)))
+    session.commit()
+    return file_name
+
+def archive_job(job, session, days):
+    """Фоновая задача: переносит давно истекшие договоры в архив"""
+    from ..archive import archive_contracts
+    
+    return archive_contracts(session.get_bind(), days, progress=job.report)
+
+def reports_job(job, session):
+    """Фоновая задача: отчеты по договорам (pandas загружается при первом отчете)"""
+    from ..reports import get_reports
+    
+    return get_reports(session)
+
+def index_documents_job(job, session, check_files):
+    """Фоновая задача: извлекает текст новых (или измененных) документов в индекс"""
+    from ..document_index import index_documents
+    
+    return index_documents(session, check_files, progress=job.report)
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Управление договорами 1.0")
+        self.resize(1200, 700)
+        
+        # Сессия окна живет все время работы, поэтому читающие транзакции
+        # завершаются сразу после запросов (см. end_read); объекты при этом
+        # не сбрасываются, чтобы открытый в форме договор сохранял прочитанную версию
+        self.session = get_session(expire_on_commit=False)
+        self.jobs = JobManager(self.session.get_bind(), self)
+        self.notifier = ExpiryNotifier(self.session.get_bind(), self)
+        self.notifier.notified.connect(self.show_expiry_notifications)
+        # Изменения, сделанные другими пользователями той же базы
+        self.watcher = ChangeWatcher(self.session.get_bind(), self)
+        self.watcher.changed.connect(self.apply_changes)
+        self.model = None
+        self.filter = ContractFilter()
+        self.diagnostics_dialog = None
+        # Индексация документов идет одной задачей; запрос во время работы
+        # выполняется после ее завершения
+        self.indexing = False
+        self.index_requested = None
+        self.setup_ui()
+        self.setup_menu()
+        # Данные загружаем после первой отрисовки окна
+        QTimer.singleShot(0, self.load_contracts)
+        QTimer.singleShot(0, self.notifier.start)
+        QTimer.singleShot(0, self.watcher.start)
+        QTimer.singleShot(0, self.index_new_documents)
+    
+    def setup_ui(self):
+        """Настройка интерфейса"""
+        central_widget = QWidget()
+        layout = QVBoxLayout()
+        
+        # Кнопки управления
+        button_layout = QHBoxLayout()
+        
+        self.add_button = QPushButton("Добавить")
+        self.add_button.clicked.connect(self.add_contract)
+        
+        self.edit_button = QPushButton("Редактировать")
+        self.edit_button.clicked.connect(self.edit_contract)
+        
+        self.delete_button = QPushButton("Удалить")
+        self.delete_button.clicked.connect(self.delete_contract)
+        
+        self.search_button = QPushButton("Поиск")
+        self.search_button.clicked.connect(self.search_contracts)
+        
+        self.refresh_button = QPushButton("Обновить")
+        self.refresh_button.clicked.connect(self.load_contracts)
+        
+        self.filter_button = QPushButton("Фильтры")
+        self.filter_button.setCheckable(True)
+        self.filter_button.toggled.connect(self.toggle_filters)
+        
+        # Архив давно истекших договоров (только SQLite) показывается по запросу
+        self.archive_button = QPushButton("Архив")
+        self.archive_button.setCheckable(True)
+        self.archive_button.setToolTip("Показывать также договоры из архива")
+        self.archive_button.setEnabled(self.session.get_bind().dialect.name == 'sqlite')
+        self.archive_button.toggled.connect(lambda checked: self.load_contracts())
+        
+        # Поиск по мере ввода: запрос отправляется после паузы в наборе
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Поиск по номеру, названию, контрагенту...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setMinimumWidth(300)
+        
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.search_contracts)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.search_edit.returnPressed.connect(self.search_contracts)
+        
+        # Панель отбора; условия учитываются, пока она открыта
+        self.filter_panel = FilterPanel()
+        self.filter_panel.hide()
+        self.filter_panel.changed.connect(self.search_timer.start)
+        
+        button_layout.addWidget(self.add_button)
+        button_layout.addWidget(self.edit_button)
+        button_layout.addWidget(self.delete_button)
+        button_layout.addWidget(self.search_button)
+        button_layout.addWidget(self.refresh_button)
+        button_layout.addWidget(self.filter_button)
+        button_layout.addWidget(self.archive_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.search_edit)
+        
+        # Таблица договоров
+        self.table = QTableView()
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.doubleClicked.connect(self.edit_contract)
+        
+        # Сортировку по щелчку на заголовке выполняет база данных
+        self.table.horizontalHeader().setSortIndicator(
+            DEFAULT_SORT_COLUMN, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        
+        # Включение контекстного меню
+        self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self.show_context_menu)
+        
+        # Статус бар
+        self.status_label = QLabel()
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        
+        layout.addLayout(button_layout)
+        layout.addWidget(self.filter_panel)
+        layout.addWidget(self.table)
+        layout.addWidget(self.status_label)
+        central_widget.setLayout(layout)
+        self.setCentralWidget(central_widget)
+        
+        # Панель фоновых задач (импорт, экспорт, копирование документов)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.jobs.panel)
+    
+    def setup_menu(self):
+        """Настройка меню"""
+        menubar = self.menuBar()
+        
+        # Меню Файл
+        file_menu = menubar.addMenu("Файл")
+        
+        export_action = QAction("Экспорт в Excel", self)
+        export_action.triggered.connect(self.export_excel)
+        file_menu.addAction(export_action)
+        
+        import_action = QAction("Импорт из Excel", self)
+        import_action.triggered.connect(self.import_excel)
+        file_menu.addAction(import_action)
+        
+        file_menu.addSeparator()
+        
+        exit_action = QAction("Выход", self)
+        exit_action.triggered.connect(self.close)
+        file_menu.addAction(exit_action)
+        
+        # Меню Действия
+        action_menu = menubar.addMenu("Действия")
+        
+        check_expiring_action = QAction("Проверить истекающие", self)
+        check_expiring_action.triggered.connect(self.check_expiring)
+        action_menu.addAction(check_expiring_action)
+        
+        dashboard_action = QAction("Сводка", self)
+        dashboard_action.triggered.connect(self.show_dashboard)
+        action_menu.addAction(dashboard_action)
+        
+        reports_action = QAction("Отчеты", self)
+        reports_action.triggered.connect(self.show_reports)
+        action_menu.addAction(reports_action)
+        
+        action_menu.addSeparator()
+        
+        document_search_action = QAction("Поиск в документах", self)
+        document_search_action.triggered.connect(self.show_document_search)
+        action_menu.addAction(document_search_action)
+        
+        reindex_action = QAction("Обновить индекс документов", self)
+        reindex_action.triggered.connect(lambda: self.index_documents(check_files=True))
+        action_menu.addAction(reindex_action)
+        
+        action_menu.addSeparator()
+        
+        archive_action = QAction("Перенести истекшие договоры в архив", self)
+        archive_action.triggered.connect(self.archive_contracts)
+        action_menu.addAction(archive_action)
+        
+        # Меню Помощь
+        help_menu = menubar.addMenu("Помощь")
+        
+        about_action = QAction("О программе", self)
+        about_action.triggered.connect(self.show_about)
+        help_menu.addAction(about_action)
+        
+        license_action = QAction("Лицензия", self)
+        license_action.triggered.connect(self.show_license)
+        help_menu.addAction(license_action)
+        
+        # Панель диагностики не показывается в меню
+        diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        diagnostics_shortcut.activated.connect(self.show_diagnostics)
+    
+    def show_about(self):
+        """Показывает информацию о программе"""
+        about_text = """<b>Управление договорами</b><br><br>
+        Версия 1.0<br>
+        Программа для учета и управления договорами<br><br>
+        © 2025 Иван Пожидаев. Все права защищены."""
+        QMessageBox.about(self, "О программе", about_text)
+    
+    def show_license(self):
+        """Показывает лицензионное соглашение"""
+        license_text = """<b>Лицензия MIT</b><br><br>
+        Copyright (c) 2025 Иван Пожидаев<br>
+        E-mail: ivan@ivanpozhidaev.ru<br><br>
+        Эта программа распространяется под лицензией MIT. Разрешается использование, копирование
+        и распространение этой программы в любых целях, при условии указания авторства. <br>"""
+        QMessageBox.information(self, "Лицензия", license_text)
+    
+    def show_context_menu(self, position):
+        """Показывает контекстное меню для таблицы"""
+        menu = QMenu()
+        
+        export_action = QAction("Экспорт выделенного", self)
+        export_action.triggered.connect(self.export_selected)
+        menu.addAction(export_action)
+        
+        view_doc_action = QAction("Просмотреть документ", self)
+        view_doc_action.triggered.connect(self.view_document)
+        menu.addAction(view_doc_action)
+        
+        menu.exec(self.table.viewport().mapToGlobal(position))
+    
+    def current_filter(self):
+        """Условия отбора: строка поиска и (если открыта) панель фильтров"""
+        if self.filter_button.isChecked():
+            return self.filter_panel.contract_filter(self.search_edit.text())
+        return ContractFilter(text=self.search_edit.text())
+    
+    def toggle_filters(self, checked):
+        """Показывает или скрывает панель фильтров и перечитывает таблицу"""
+        self.filter_panel.setVisible(checked)
+        if not self.filter_panel.contract_filter().is_empty():
+            self.search_contracts()
+    
+    def load_contracts(self):
+        """Загрузка договоров в таблицу"""
+        with diagnostics.timed('load_contracts'):
+            # Таблица не держит объекты ORM; договоры, открытые ранее для
+            # изменения, больше не нужны - очищаем карту объектов сессии
+            self.session.expunge_all()
+            self.filter = self.current_filter()
+            include_archive = self.archive_button.isChecked()
+            filters = self.filter.criteria(self.session, include_archive=include_archive)
+            headers = ["Номер", "Наименование", "Контрагент", "Начало", "Окончание", "Осталось",
+                       "Документ"]
+            header = self.table.horizontalHeader()
+            self.model = ContractsTableModel(
+                self.session, headers, filters,
+                sort_column=header.sortIndicatorSection(), sort_order=header.sortIndicatorOrder(),
+                include_archive=include_archive)
+            self.table.setModel(self.model)
+            self.watcher.sync()
+            self.update_status()
+    
+    def refresh_contracts(self):
+        """Перечитывает текущую выборку, сохраняя положение прокрутки"""
+        scroll = self.table.verticalScrollBar().value()
+        self.model.refresh()
+        self.watcher.sync()
+        self.table.verticalScrollBar().setValue(scroll)
+        self.update_status()
+    
+    def update_status(self):
+        """Обновление статус бара (статистика кэшируется до изменения договоров)"""
+        stats = get_statistics(self.session, detailed=False)
+        status = (f"Всего договоров: {stats.total} | Активных: {stats.active} | "
+                  f"Истекших: {stats.expired}")
+        if not self.filter.is_empty():
+            status += f" | Найдено: {self.model.total_count()}"
+        self.status_label.setText(status)
+        self.end_read()
+    
+    def end_read(self):
+        """Завершает читающую транзакцию сессии окна.
+        
+        Иначе соединение остается занятым до следующей записи, а в PostgreSQL
+        висит в состоянии idle in transaction и держит снимок данных."""
+        self.session.commit()
+    
+    def export_excel(self):
+        """Экспорт всех договоров в Excel"""
+        empty = self.session.query(Contract.id).first() is None
+        self.end_read()
+        if empty:
+            QMessageBox.warning(self, "Внимание", "Нет договоров для экспорта!")
+            return
+        
+        self.start_export()
+    
+    def export_selected(self):
+        """Экспорт выбранных договоров в Excel"""
+        ids = self.get_selected_ids()
+        if not ids:
+            QMessageBox.warning(self, "Внимание", "Выберите договоры для экспорта!")
+            return
+        
+        self.start_export(ids)
+    
+    def start_export(self, ids=None):
+        """Запускает экспорт в фоне"""
+        # pandas/openpyxl загружаются только при первом экспорте или импорте
+        from .excel_utils import choose_export_file, run_export
+        
+        file_path = choose_export_file(self)
+        if not file_path:
+            return
+        
+        self.jobs.submit(
+            "Экспорт договоров", run_export, file_path, ids,
+            on_finished=lambda count: QMessageBox.information(
+                self, "Успех", f"Экспорт успешно завершен! Выгружено договоров: {count}"),
+            on_failed=lambda message: QMessageBox.warning(
+                self, "Ошибка", f"Ошибка при экспорте: {message}"))
+    
+    def import_excel(self):
+        """Импорт договоров из Excel"""
+        reply = QMessageBox.question(
+            self, "Подтверждение",
+            "Вы уверены, что хотите импортировать договоры из Excel?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if reply == QMessageBox.StandardButton.Yes:
+            from .excel_utils import choose_import_file, run_import
+            
+            options = choose_import_file(self)
+            if not options:
+                return
+            
+            file_path, mode = options
+            self.jobs.submit(
+                "Импорт из Excel", run_import, file_path, mode,
+                on_finished=self.on_import_finished,
+                on_failed=lambda message: QMessageBox.warning(
+                    self, "Ошибка", f"Ошибка при импорте: {message}"),
+                on_cancelled=self.on_import_cancelled)
+    
+    def apply_changes(self, changes):
+        """Показывает изменения, внесенные в базу другими копиями программы"""
+        # Статистика кэшируется до изменений в этой копии - чужие сбрасывают ее здесь
+        invalidate_statistics()
+        if changes.reset:
+            self.refresh_contracts()
+        elif self.model is not None:
+            self.model.apply_changes(changes.changed, changes.deleted, changes.inserted)
+        self.update_status()
+        # В очереди уведомлений перечитываются только измененные договоры
+        self.notifier.apply_changes(changes)
+    
+    def on_import_finished(self, result):
+        """Применяет результат импорта к таблице"""
+        self.refresh_contracts()
+        self.notifier.start()
+        QMessageBox.information(self, "Успех", result.message())
+    
+    def on_import_cancelled(self):
+        self.refresh_contracts()
+        self.notifier.start()
+        QMessageBox.information(
+            self, "Импорт прерван", "Импорт отменен. Уже сохраненные договоры остались в базе.")
+    
+    def get_selected_ids(self):
+        """Возвращает id выбранных договоров (без загрузки самих договоров)"""
+        if self.model is None:
+            return []
+        indexes = self.table.selectionModel().selectedRows()
+        if not indexes:
+            return []
+        
+        return [self.model.contract_id(index.row()) for index in indexes]
+    
+    def add_contract(self):
+        """Добавление нового договора"""
+        form = ContractForm()
+        if form.exec():
+            data = form.get_data()
+        
+            try:
+                contract = Contract(
+                    number=data['number'],
+                    name=data['name'],
+                    counterparty=data['counterparty'],
+                    start_date=data['start_date'],
+                    end_date=data['end_date'],
+                    description=data['description']
+                )
+            
+                self.session.add(contract)
+                self.session.commit()  # Сначала сохраняем договор, чтобы получить ID
+            
+                # Прикрепление документа, если есть (копирование идет в фоне)
+                if data['file_path']:
+                    self.attach_document(contract, data['file_path'])
+            
+                self.show_row(self.model.insert_contract(contract))
+                self.update_status()
+                self.notifier.contract_changed(contract)
+                QMessageBox.information(self, "Успех", "Договор успешно добавлен!")
+        
+            except Exception as e:
+                self.session.rollback()
+                QMessageBox.critical(self, "Ошибка", f"Не удалось добавить договор: {str(e)}")
+    
+    def edit_contract(self):
+        """Редактирование договора"""
+        contract = self.get_selected_contract()
+        if not contract:
+            return
+        row = self.selected_row()
+    
+        form = ContractForm(contract)
+        if form.exec():
+            data = form.get_data()
+        
+            try:
+                contract.number = data['number']
+                contract.name = data['name']
+                contract.counterparty = data['counterparty']
+                contract.start_date = data['start_date']
+                contract.end_date = data['end_date']
+                contract.description = data['description']
+            
+                # Проверяем, был ли выбран новый файл
+                new_file = None
+                if data['file_path']:
+                    # Если у договора уже есть документ
+                    if contract.documents:
+                        current_file = contract.documents[0].file_path
+                        # Если выбран другой файл
+                        if data['file_path'] != current_file:
+                            from ..file_manager import delete_document
+                            delete_document(self.session, contract.documents[0])
+                            new_file = data['file_path']
+                    else:
+                        # Если документа не было, просто прикрепляем новый
+                        new_file = data['file_path']
+            
+                self.session.commit()
+                if new_file:
+                    self.attach_document(contract, new_file)
+                self.show_row(self.model.update_contract(row, contract))
+                self.update_status()
+                self.notifier.contract_changed(contract)
+                QMessageBox.information(self, "Успех", "Договор успешно обновлен!")
+        
+            except StaleDataError:
+                self.session.rollback()
+                self.show_conflict()
+            except Exception as e:
+                self.session.rollback()
+                QMessageBox.critical(self, "Ошибка", f"Не удалось обновить договор: {str(e)}")
+    
+    def delete_contract(self):
+        """Удаление договора"""
+        contract = self.get_selected_contract()
+        if not contract:
+            return
+        
+        reply = QMessageBox.question(
+            self, "Подтверждение",
+            f"Вы уверены, что хотите удалить договор {contract.number}?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if reply == QMessageBox.StandardButton.Yes:
+            try:
+                # Строки документов база удалит вместе с договором,
+                # здесь только отмечаем файлы, которые больше не нужны
+                from ..file_manager import release_contract_files
+                release_contract_files(self.session, contract.id)
+                
+                contract_id = contract.id
+                row = self.selected_row()
+                self.session.delete(contract)
+                self.session.commit()
+                self.model.remove_row(row)
+                self.update_status()
+                self.notifier.contract_removed(contract_id)
+                QMessageBox.information(self, "Успех", "Договор успешно удален!")
+            
+            except StaleDataError:
+                self.session.rollback()
+                self.show_conflict()
+            except Exception as e:
+                self.session.rollback()
+                QMessageBox.critical(self, "Ошибка", f"Не удалось удалить договор: {str(e)}")
+    
+    def show_conflict(self):
+        """Договор успел изменить или удалить другой пользователь"""
+        self.refresh_contracts()
+        QMessageBox.warning(
+            self, "Конфликт изменений",
+            "Договор был изменен или удален другим пользователем.\n"
+            "Таблица обновлена - повторите действие с актуальными данными.")
+    
+    def get_selected_contract(self):
+        """Возвращает выбранный в таблице договор"""
+        indexes = self.table.selectionModel().selectedRows() if self.model is not None else []
+        if not indexes:
+            QMessageBox.warning(self, "Внимание", "Выберите договор из таблицы!")
+            return None
+        if self.model.is_archived(indexes[0].row()):
+            QMessageBox.information(
+                self, "Архив", "Договор перенесен в архив и доступен только для просмотра")
+            return None
+        
+        contract = self.model.get_contract(indexes[0].row())
+        # Форма и подтверждение открываются без начатой транзакции
+        self.end_read()
+        return contract
+    
+    def selected_row(self):
+        """Номер выбранной строки таблицы или -1"""
+        indexes = self.table.selectionModel().selectedRows() if self.model is not None else []
+        return indexes[0].row() if indexes else -1
+    
+    def show_row(self, row):
+        """Выделяет строку и прокручивает к ней таблицу"""
+        if row >= 0:
+            self.table.selectRow(row)
+            self.table.scrollTo(self.model.index(row, 0))
+    
+    def search_contracts(self):
+        """Поиск договоров по введенному тексту и условиям панели фильтров"""
+        self.search_timer.stop()
+        self.load_contracts()
+    
+    def attach_document(self, contract, file_path):
+        """Прикрепление документа к договору (файл копируется в фоне)"""
+        self.jobs.submit(
+            f"Копирование документа {contract.number}", store_document,
+            contract.id, file_path,
+            on_finished=lambda file_name: self.document_stored(),
+            on_failed=lambda message: QMessageBox.warning(
+                self, "Ошибка", f"Ошибка при загрузке файла: {message}"))
+    
+    def document_stored(self):
+        """Документ скопирован в хранилище: обновляем договоры и индексируем текст"""
+        self.session.expire_all()
+        self.index_new_documents()
+    
+    def index_new_documents(self):
+        """Индексирует документы, которых еще нет в индексе (без проверки файлов)"""
+        from ..document_index import is_available, count_unindexed
+        
+        if is_available(self.session):
+            unindexed = count_unindexed(self.session)
+            self.end_read()
+            if unindexed:
+                self.index_documents()
+    
+    def index_documents(self, check_files=False):
+        """Фоновая индексация текста документов для поиска"""
+        from ..document_index import is_available
+        
+        if not is_available(self.session):
+            QMessageBox.warning(
+                self, "Внимание",
+                "Поиск по тексту документов работает с базой SQLite и требует пакет pypdf")
+            return
+        if self.indexing:
+            self.index_requested = bool(self.index_requested) or check_files
+            return
+        
+        def finished():
+            self.indexing = False
+            if self.index_requested is not None:
+                check_files, self.index_requested = self.index_requested, None
+                self.index_documents(check_files)
+        
+        self.indexing = True
+        self.jobs.submit(
+            "Индексация документов", index_documents_job, check_files,
+            on_finished=lambda result: finished(),
+            on_failed=lambda message: finished(),
+            on_cancelled=finished)
+    
+    def show_document_search(self):
+        """Поиск договоров по тексту прикрепленных документов"""
+        from .document_search import DocumentSearchDialog
+        
+        dialog = DocumentSearchDialog(self.session.get_bind(), self)
+        dialog.contract_selected.connect(self.show_contract)
+        dialog.exec()
+    
+    def show_contract(self, contract_id):
+        """Выделяет договор в таблице; если его нет среди загруженных строк - находит по номеру"""
+        row = self.model.find_row(contract_id)
+        if row < 0:
+            contract = self.session.get(Contract, contract_id)
+            self.end_read()
+            if contract is None:
+                return
+            self.filter_button.setChecked(False)
+            self.search_edit.setText(contract.number)
+            self.search_contracts()
+            row = self.model.find_row(contract_id)
+        self.show_row(row)
+    
+    def archive_contracts(self):
+        """Перенос договоров, истекших больше ARCHIVE_DAYS дней назад, в архив"""
+        from ..archive import ARCHIVE_DAYS, is_available, count_expired
+        
+        engine = self.session.get_bind()
+        if not is_available(engine):
+            QMessageBox.warning(self, "Внимание", "Архив договоров поддерживается только для базы SQLite")
+            return
+        count = count_expired(engine, ARCHIVE_DAYS)
+        if not count:
+            QMessageBox.information(
+                self, "Архив", f"Нет договоров, истекших больше {ARCHIVE_DAYS} дней назад")
+            return
+        reply = QMessageBox.question(
+            self, "Подтверждение",
+            f"Перенести в архив договоры, истекшие больше {ARCHIVE_DAYS} дней назад ({count})?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        
+        def finished(moved):
+            invalidate_statistics()
+            self.refresh_contracts()
+            QMessageBox.information(self, "Архив", f"Перенесено в архив договоров: {moved}")
+        
+        self.jobs.submit(
+            "Перенос договоров в архив", archive_job, ARCHIVE_DAYS,
+            on_finished=finished,
+            on_failed=lambda message: QMessageBox.warning(
+                self, "Ошибка", f"Не удалось перенести договоры в архив: {message}"),
+            on_cancelled=self.refresh_contracts)
+    
+    def view_document(self):
+        """Просмотр прикрепленного документа"""
+        row = self.selected_row()
+        if self.model is not None and self.model.is_archived(row):
+            # Документы архивного договора хранятся в архиве под его id в архиве
+            from ..archive import document_paths
+            file_paths = document_paths(self.session.get_bind(), -self.model.contract_id(row))
+        else:
+            contract = self.get_selected_contract()
+            if not contract:
+                return
+            file_paths = [document.file_path for document in contract.documents]
+        
+        if not file_paths:
+            QMessageBox.information(self, "Информация", "Нет прикрепленных документов")
+            return
+        
+        try:
+            os.startfile(file_paths[0])
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось открыть файл: {str(e)}")
+    
+    def check_expiring(self):
+        """Проверка истекающих договоров"""
+        expiring = check_expiring_contracts(self.session)
+        self.end_read()
+        if expiring:
+            msg = "Следующие договоры скоро истекают:\n\n"
+            msg += "\n".join(
+                f"- {c.number} ({c.counterparty}): {c.end_date.strftime('%d.%m.%Y')} "
+                f"(осталось {(c.end_date - date.today()).days} дней)"
+                for c in expiring
+            )
+            
+            QMessageBox.warning(self, "Внимание", msg)
+        else:
+            QMessageBox.information(self, "Информация", "Нет договоров, которые скоро истекают")
+    
+    def show_expiry_notifications(self, notifications):
+        """Показывает уведомления планировщика о наступивших порогах"""
+        msg = "Договоры, срок которых подходит к концу:\n\n"
+        msg += "\n".join(
+            f"- {number} ({counterparty}): {end_date.strftime('%d.%m.%Y')} "
+            + (f"(осталось {days_left} дней)" if days_left else "(истекает сегодня)")
+            for (_, number, _, counterparty, end_date), _, days_left in notifications[:30]
+        )
+        if len(notifications) > 30:
+            msg += f"\n...и еще {len(notifications) - 30}"
+        QMessageBox.warning(self, "Внимание", msg)
+    
+    def show_dashboard(self):
+        """Сводка по договорам"""
+        from .dashboard import DashboardDialog
+        
+        DashboardDialog(self.session.get_bind(), self).exec()
+    
+    def show_reports(self):
+        """Отчеты по договорам; считаются в фоне, без изменений договоров берутся из кэша"""
+        from .reports import ReportsDialog
+        
+        self.jobs.submit(
+            "Отчеты по договорам", reports_job,
+            on_finished=lambda reports: ReportsDialog(reports, self).exec(),
+            on_failed=lambda message: QMessageBox.warning(
+                self, "Ошибка", f"Не удалось построить отчеты: {message}"))
+    
+    def show_diagnostics(self):
+        """Скрытая панель статистики запросов и операций (Ctrl+Shift+D)"""
+        from .diagnostics_dialog import DiagnosticsDialog
+        
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+    
+    def closeEvent(self, event):
+        """Закрытие приложения"""
+        self.jobs.cancel_all()
+        self.jobs.wait()
+        self.watcher.stop()
+        self.session.close()
+        optimize(self.session.get_bind())
+        event.accept()
         
\ No newline at end of file
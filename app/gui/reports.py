@@ -0,0 +1,70 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView,
+    QDialogButtonBox, QPushButton, QFileDialog, QMessageBox
+)
+from PySide6.QtCore import Qt
+from datetime import date
+
+from ..reports import report_tables, export_reports
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.strftime("%d.%m.%Y")
+    return str(value)
+
+
+def _table(report):
+    table = QTableWidget(len(report.rows), len(report.headers))
+    table.setHorizontalHeaderLabels(report.headers)
+    table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+    table.horizontalHeader().setStretchLastSection(True)
+    table.verticalHeader().setVisible(False)
+    for row, values in enumerate(report.rows):
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(_text(value))
+            if isinstance(value, (int, float)):
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            table.setItem(row, column, item)
+    return table
+
+
+class ReportsDialog(QDialog):
+    """Отчеты: сводка, окончания по месяцам, контрагенты, календарь продлений"""
+
+    def __init__(self, reports, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Отчеты на {reports.today.strftime('%d.%m.%Y')}")
+        self.resize(900, 600)
+        self.reports = reports
+
+        layout = QVBoxLayout()
+        tabs = QTabWidget()
+        for report in report_tables(reports):
+            tabs.addTab(_table(report), report.title)
+        layout.addWidget(tabs, 1)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        export_button = QPushButton("Экспорт в Excel")
+        export_button.clicked.connect(self.export)
+        buttons.addButton(export_button, QDialogButtonBox.ButtonRole.ActionRole)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def export(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт отчетов", "", "Excel Files (*.xlsx)")
+        if not file_path:
+            return
+        if not file_path.lower().endswith('.xlsx'):
+            file_path += '.xlsx'
+        try:
+            export_reports(self.reports, file_path)
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Ошибка при экспорте: {str(e)}")
+            return
+        QMessageBox.information(self, "Успех", "Отчеты выгружены в Excel")
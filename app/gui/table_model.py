@@ -1,59 +1,612 @@
-from PySide6.QtCore import Qt, QAbstractTableModel
-from PySide6.QtGui import QColor
-from datetime import date
-
-class ContractsTableModel(QAbstractTableModel):
-    def __init__(self, data, headers, parent=None):
-        super().__init__(parent)
-        self._data = data
-        self._headers = headers
-    
-    def rowCount(self, parent=None):
-        return len(self._data)
-    
-    def columnCount(self, parent=None):
-        return len(self._headers)
-    
-    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if not index.isValid():
-            return None
-        
-        contract = self._data[index.row()]
-        col = index.column()
-        
-        if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.EditRole:
-            if col == 0:
-                return contract.number
-            elif col == 1:
-                return contract.name
-            elif col == 2:
-                return contract.counterparty
-            elif col == 3:
-                return contract.start_date.strftime("%d.%m.%Y")
-            elif col == 4:
-                return contract.end_date.strftime("%d.%m.%Y")
-            elif col == 5:
-                days_left = (contract.end_date - date.today()).days
-                return f"{days_left} дней" if days_left >= 0 else "Истек"
-        
-        elif role == Qt.ItemDataRole.TextAlignmentRole:
-            return Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter
-        
-        elif role == Qt.ItemDataRole.BackgroundRole:
-            days_left = (contract.end_date - date.today()).days
-            if days_left < 0:  # Истекшие
-                return QColor('#DC143C')  # Красный
-            elif days_left <= 30:  # Скоро истекают
-                return QColor('#FFFF00')  # Желтый
-    
-    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
-        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
-            return self._headers[section]
-        return None
-    
-    def get_contract(self, row):
-        """Возвращает договор по номеру строки"""
-        if 0 <= row < len(self._data):
-            return self._data[row]
-        return None
-    
\ No newline at end of file
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PySide6.QtGui import QColor
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.orm import selectinload
+from .. import archive, diagnostics
+from ..filters import SORT_COLUMNS, DEFAULT_SORT_COLUMN
+from ..models import Contract, Document
+
+# Количество строк, загружаемых одним запросом
+PAGE_SIZE = 200
+# Сколько страниц держать в памяти одновременно
+MAX_PAGES = 10
+# Порог "скоро истекает" в днях
+EXPIRING_DAYS = 30
+# Ограничение на число параметров в IN (...) при перечитывании измененных договоров
+IDS_CHUNK = 500
+# Загружать ли сведения о документах заранее: одним запросом на страницу
+# для колонки "Документ" и вместе с договором, открытым для изменения
+LOAD_DOCUMENTS = True
+
+# Классы подсветки строк: обычный, скоро истекает, истек
+COLOR_NONE, COLOR_EXPIRING, COLOR_EXPIRED = 0, 1, 2
+BACKGROUNDS = (None, QColor('#FFFF00'), QColor('#DC143C'))  # -, желтый, красный
+ALIGNMENT = Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter
+REMAINING_COLUMN = 5
+DOCUMENT_COLUMN = 6
+
+# Колонки договора, которые показывает таблица: страницы читаются запросом
+# Core только по ним, без объектов ORM и их состояния в сессии
+ROW_COLUMNS = (Contract.id, Contract.number, Contract.name, Contract.counterparty,
+               Contract.start_date, Contract.end_date)
+
+
+@lru_cache(maxsize=None)
+def _date_text(value):
+    # Одинаковые даты встречаются у многих строк - строка текста на дату одна
+    return value.strftime("%d.%m.%Y")
+
+
+def _cells(contract, shared):
+    """Текст колонок строки, кроме "Осталось".
+
+    contract - строка запроса по ROW_COLUMNS или объект Contract; shared
+    возвращает уже сохраненную равную строку (контрагенты повторяются)."""
+    return (contract.number, contract.name, shared(contract.counterparty),
+            _date_text(contract.start_date), _date_text(contract.end_date))
+
+
+def _color(days):
+    return COLOR_EXPIRED if days < 0 else COLOR_EXPIRING if days <= EXPIRING_DAYS else COLOR_NONE
+
+
+@lru_cache(maxsize=None)
+def _remaining(days):
+    return f"{days} дней" if days >= 0 else "Истек"
+
+
+def _file_size(size):
+    if size < 1024 * 1024:
+        return f"{max(size // 1024, 1)} КБ"
+    return f"{size / (1024 * 1024):.1f} МБ"
+
+
+def _document_text(count, size):
+    """Текст колонки "Документ": есть ли документы и их общий размер"""
+    if not count:
+        return ""
+    text = _file_size(size) if size is not None else "есть"
+    return text if count == 1 else f"{text} ({count} шт.)"
+
+
+class _Page:
+    """Страница таблицы в виде готовых к отображению колонок.
+
+    Вместо объектов договоров хранятся только id, ключи сортировки
+    и текст колонок; числа - в массивах array."""
+
+    __slots__ = ('ids', 'keys', 'columns', 'end_days', 'days_left', 'colors')
+
+    def __init__(self, rows, keys, today, shared, documents):
+        self.ids = array('q', (row.id for row in rows))
+        self.keys = keys
+        self.end_days = array('l', (row.end_date.toordinal() for row in rows))
+        self.columns = [list(column) for column in zip(*(_cells(row, shared) for row in rows))]
+        if not self.columns:
+            self.columns = [[] for _ in range(REMAINING_COLUMN)]
+        self.columns.append(None)
+        self.columns.append([documents.get(contract_id, "") for contract_id in self.ids])
+        self.update_days(today)
+
+    def update_days(self, today):
+        """Пересчитывает остаток дней и подсветку относительно today (ordinal)"""
+        self.days_left = array('l', (end - today for end in self.end_days))
+        self.colors = array('b', (_color(days) for days in self.days_left))
+        self.columns[REMAINING_COLUMN] = [_remaining(days) for days in self.days_left]
+
+    def insert(self, offset, contract, key, today, shared, document):
+        """Вставляет строку в позицию offset (document - текст колонки "Документ")"""
+        end_day = contract.end_date.toordinal()
+        days = end_day - today
+        self.ids.insert(offset, contract.id)
+        self.keys.insert(offset, key)
+        values = _cells(contract, shared) + (_remaining(days), document)
+        for column, value in zip(self.columns, values):
+            column.insert(offset, value)
+        self.end_days.insert(offset, end_day)
+        self.days_left.insert(offset, days)
+        self.colors.insert(offset, _color(days))
+
+    def pop(self, offset):
+        """Удаляет строку из позиции offset"""
+        for values in (self.ids, self.keys, self.end_days, self.days_left,
+                       self.colors, *self.columns):
+            del values[offset]
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ContractsTableModel(QAbstractTableModel):
+    """Модель таблицы договоров с постраничной (keyset) подгрузкой.
+
+    Сортировка выполняется базой: страницы читаются по ключу
+    (колонка сортировки, id) в прямом или обратном порядке. Страница -
+    это строки между ключами соседних курсоров, поэтому после точечных
+    вставок и удалений ее размер может отличаться от PAGE_SIZE.
+
+    Страницы читаются запросами Core на коротких соединениях из пула;
+    сессия нужна только для загрузки договора, открытого для изменения.
+    Сведения о документах страницы (load_documents) читаются одним
+    сгруппированным запросом, а не по запросу на строку.
+
+    С include_archive те же запросы выполняются по представлению
+    contracts_history (рабочие и архивные договоры, см. archive.py);
+    у архивных договоров id отрицательные, изменять их нельзя."""
+
+    def __init__(self, session, headers, filters=None, parent=None,
+                 sort_column=DEFAULT_SORT_COLUMN, sort_order=Qt.SortOrder.AscendingOrder,
+                 load_documents=LOAD_DOCUMENTS, include_archive=False):
+        super().__init__(parent)
+        self._session = session
+        self._engine = session.get_bind()
+        self._load_documents = load_documents
+        self._history = archive.history_adapter() if include_archive else None
+        self._headers = headers
+        self._filters = list(filters or [])
+        self._sort_column = sort_column
+        self._sort_order = sort_order
+
+        # Повторяющиеся значения (контрагенты, даты сортировки) храним в одном экземпляре
+        self._shared = {}
+        # Общее число строк берем из COUNT(*), сами строки подгружаем по мере прокрутки
+        self._total = self._count()
+        self._fetched = 0
+        # Ключ (значение колонки сортировки, id) последней строки перед каждой страницей:
+        # страница p - строки с ключом в (cursors[p], cursors[p + 1]]
+        self._cursors = [None]
+        # Номер первой строки и размер каждой подгруженной страницы
+        self._starts = []
+        self._sizes = []
+        self._pages = {}
+        # id договоров, удаленных через remove_row (их запись в журнале изменений уже учтена)
+        self._removed = set()
+
+        # Остаток дней зависит от текущей даты - пересчитываем его в полночь
+        self._today = date.today().toordinal()
+        self._midnight_timer = QTimer(self)
+        self._midnight_timer.setSingleShot(True)
+        self._midnight_timer.timeout.connect(self._on_new_day)
+        self._schedule_midnight()
+
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def _select(self, *columns):
+        return select(*columns).where(*self._filters)
+
+    def _execute(self, statement):
+        """Строки запроса; соединение сразу возвращается в пул"""
+        with self._engine.connect() as conn:
+            if self._history is not None:
+                archive.attach(conn)
+                statement = self._history.traverse(statement)
+            return conn.execute(statement).all()
+
+    def _count(self):
+        return self._execute(self._select(func.count(Contract.id)))[0][0]
+
+    def _documents(self, ids):
+        """Текст колонки "Документ" для договоров: {id: текст}, только у кого есть документы"""
+        documents = {}
+        if not self._load_documents:
+            return documents
+        # Документы архивных договоров (id < 0) - в архиве, под id договора в архиве
+        tables = ((Document.__table__, [i for i in ids if i > 0], 1),
+                  (archive.archived_documents, [-i for i in ids if i < 0], -1))
+        for table, table_ids, sign in tables:
+            for i in range(0, len(table_ids), IDS_CHUNK):
+                rows = self._execute(
+                    select(table.c.contract_id, func.count(), func.sum(table.c.file_size))
+                    .where(table.c.contract_id.in_(table_ids[i:i + IDS_CHUNK]))
+                    .group_by(table.c.contract_id))
+                for contract_id, count, size in rows:
+                    documents[sign * contract_id] = _document_text(count, size)
+        return documents
+
+    def _document(self, contract_id, document=None):
+        """Текст колонки "Документ" договора; document - уже прочитанный текст"""
+        if document is not None:
+            return document
+        return self._documents([contract_id]).get(contract_id, "")
+
+    def _share(self, value):
+        return self._shared.setdefault(value, value)
+
+    def _sort_key(self, contract):
+        value = getattr(contract, SORT_COLUMNS[self._sort_column].key)
+        return (self._share(value), contract.id)
+
+    def _before(self, a, b):
+        """Идет ли ключ a раньше ключа b в текущем порядке сортировки"""
+        if self._sort_order == Qt.SortOrder.DescendingOrder:
+            return a > b
+        return a < b
+
+    def _bisect(self, keys, key):
+        """Позиция для вставки key в упорядоченный (в порядке сортировки) список keys"""
+        low, high = 0, len(keys)
+        while low < high:
+            middle = (low + high) // 2
+            if self._before(keys[middle], key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _load_page(self, page):
+        """Загружает страницу договоров, начиная с сохраненного ключа.
+
+        Новая страница - до PAGE_SIZE строк; уже известная - все строки
+        до ключа следующей страницы."""
+        column = SORT_COLUMNS[self._sort_column]
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        key = tuple_(column, Contract.id)
+        query = self._select(*ROW_COLUMNS)
+        cursor = self._cursors[page]
+        if cursor is not None:
+            query = query.where(key < cursor if descending else key > cursor)
+        if descending:
+            query = query.order_by(column.desc(), Contract.id.desc())
+        else:
+            query = query.order_by(column, Contract.id)
+        if page + 1 < len(self._cursors):
+            bound = self._cursors[page + 1]
+            query = query.where(key >= bound if descending else key <= bound)
+        else:
+            query = query.limit(PAGE_SIZE)
+        with diagnostics.timed('table_page'):
+            rows = self._execute(query)
+            documents = self._documents([row.id for row in rows])
+
+        keys = [self._sort_key(row) for row in rows]
+        if keys and page + 1 == len(self._cursors):
+            self._cursors.append(keys[-1])
+        return _Page(rows, keys, self._today, self._share, documents)
+
+    def _page(self, page):
+        """Возвращает страницу из кэша, при необходимости подгружая ее"""
+        cached = self._pages.get(page)
+        if cached is None:
+            cached = self._load_page(page)
+            self._pages[page] = cached
+            # Выгружаем страницы, наиболее удаленные от текущей
+            while len(self._pages) > MAX_PAGES:
+                far = max(self._pages, key=lambda p: abs(p - page))
+                del self._pages[far]
+        return cached
+
+    def _schedule_midnight(self):
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), time())
+        self._midnight_timer.start(int((midnight - now).total_seconds() * 1000) + 1000)
+
+    def _on_new_day(self):
+        """Обновляет колонку "Осталось" и подсветку после смены даты"""
+        self._today = date.today().toordinal()
+        for cached in self._pages.values():
+            cached.update_days(self._today)
+        if self._fetched:
+            self.dataChanged.emit(
+                self.index(0, 0), self.index(self._fetched - 1, len(self._headers) - 1),
+                [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.BackgroundRole])
+        self._schedule_midnight()
+
+    def refresh(self):
+        """Перечитывает данные на месте, подгружая столько же строк, сколько было"""
+        self._reload(max(self._fetched, 1))
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Сортировка по колонке запросом к базе; таблица перечитывается с начала"""
+        if not 0 <= column < len(SORT_COLUMNS):
+            return
+        if (column, order) == (self._sort_column, self._sort_order):
+            return
+        self._sort_column = column
+        self._sort_order = order
+        self._reload(1)
+
+    def _reload(self, target):
+        self.beginResetModel()
+        self._total = self._count()
+        self._fetched = 0
+        self._cursors = [None]
+        self._starts = []
+        self._sizes = []
+        self._pages = {}
+        while self._fetched < min(target, self._total):
+            if not self._append_page():
+                break
+        self.endResetModel()
+
+    def _append_page(self):
+        """Подгружает следующую страницу; возвращает число новых строк"""
+        page = len(self._sizes)
+        count = len(self._page(page))
+        if count == 0:
+            self._pages.pop(page, None)
+            return 0
+        self._starts.append(self._fetched)
+        self._sizes.append(count)
+        self._fetched += count
+        return count
+
+    def total_count(self):
+        """Общее количество договоров, подходящих под фильтр"""
+        return self._total
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._headers)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetched < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+
+        count = len(self._page(len(self._sizes)))
+        if count == 0:
+            # Часть строк удалили после подсчета - больше подгружать нечего
+            self._pages.pop(len(self._sizes), None)
+            self._total = self._fetched
+            return
+
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._append_page()
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if diagnostics.enabled:
+            diagnostics.count_role(role)
+
+        if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.EditRole:
+            cached, offset = self._locate(index.row())
+            if cached is not None:
+                return cached.columns[index.column()][offset]
+
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            return ALIGNMENT
+
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            cached, offset = self._locate(index.row())
+            if cached is not None:
+                return BACKGROUNDS[cached.colors[offset]]
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return None
+
+    def _page_of_row(self, row):
+        # У опустевшей страницы то же начало, что у следующей; bisect_right выберет следующую
+        return bisect_right(self._starts, row) - 1
+
+    def _locate(self, row):
+        """Возвращает страницу и смещение строки в ней"""
+        if 0 <= row < self._fetched:
+            page = self._page_of_row(row)
+            cached = self._page(page)
+            offset = row - self._starts[page]
+            if offset < len(cached):
+                return cached, offset
+        return None, 0
+
+    def contract_id(self, row):
+        """id договора в строке или None"""
+        cached, offset = self._locate(row)
+        if cached is not None:
+            return cached.ids[offset]
+        return None
+
+    def is_archived(self, row):
+        """Находится ли договор строки в архиве"""
+        contract_id = self.contract_id(row)
+        return contract_id is not None and contract_id < 0
+
+    def get_contract(self, row):
+        """Загружает из базы договор строки (объект ORM для изменения или удаления).
+
+        Документы договора загружаются сразу, вторым запросом (selectinload):
+        их используют форма, замена и просмотр файла."""
+        contract_id = self.contract_id(row)
+        if contract_id is None or self.is_archived(row):
+            return None
+        options = [selectinload(Contract.documents)] if self._load_documents else []
+        return self._session.get(Contract, contract_id, populate_existing=True, options=options)
+
+    def _resize_page(self, page, delta):
+        """Меняет размер страницы и сдвигает начала следующих страниц"""
+        self._sizes[page] += delta
+        for later in range(page + 1, len(self._starts)):
+            self._starts[later] += delta
+        self._fetched += delta
+        self._total += delta
+
+    def _matches(self, contract_id):
+        """Подходит ли договор под фильтр модели (запрос по первичному ключу)"""
+        if not self._filters:
+            return True
+        return bool(self._execute(
+            self._select(Contract.id).where(Contract.id == contract_id).limit(1)))
+
+    def _find_page(self, key):
+        """Страница, в диапазон которой попадает key, или None за пределами подгруженных строк"""
+        page = self._bisect(self._cursors[1:len(self._sizes) + 1], key)
+        return page if page < len(self._sizes) else None
+
+    def insert_contract(self, contract, document=None):
+        """Добавляет новый договор на его место в порядке сортировки.
+
+        contract - объект Contract или строка с полями ROW_COLUMNS; document -
+        текст колонки "Документ", если уже известен. Возвращает номер строки
+        или -1, если договор не подходит под фильтр или попадает в еще
+        не подгруженную часть таблицы."""
+        if not self._matches(contract.id):
+            return -1
+        key = self._sort_key(contract)
+        page = self._find_page(key)
+        if page is None:
+            # Строка подгрузится вместе со следующими страницами
+            self._total += 1
+            return -1
+
+        was_loaded = page in self._pages
+        cached = self._page(page)
+        offset = self._bisect(cached.keys, key)
+        row = self._starts[page] + offset
+        if offset < len(cached.keys) and cached.keys[offset] == key:
+            if was_loaded:
+                # Договор уже в таблице - обновляем строку
+                cached.pop(offset)
+                cached.insert(offset, contract, key, self._today, self._share,
+                              self._document(contract.id, document))
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self._headers) - 1))
+                return row
+            # Страница только что перечитана из базы и уже содержит договор
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._resize_page(page, 1)
+            self.endInsertRows()
+            return row
+
+        self.beginInsertRows(QModelIndex(), row, row)
+        cached.insert(offset, contract, key, self._today, self._share,
+                      self._document(contract.id, document))
+        self._resize_page(page, 1)
+        self.endInsertRows()
+        return row
+
+    def remove_row(self, row):
+        """Убирает строку удаленного договора"""
+        cached, offset = self._locate(row)
+        if cached is not None:
+            self._removed.add(cached.ids[offset])
+            self._remove_row(row)
+
+    def _remove_row(self, row):
+        cached, offset = self._locate(row)
+        if cached is None:
+            return
+        page = self._page_of_row(row)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        cached.pop(offset)
+        self._resize_page(page, -1)
+        self.endRemoveRows()
+
+    def update_contract(self, row, contract, document=None):
+        """Обновляет строку измененного договора.
+
+        Если договор остался на своем месте в порядке сортировки, меняется
+        только эта строка; иначе строка переносится. Возвращает новый номер
+        строки или -1, если договор больше не виден в таблице."""
+        cached, offset = self._locate(row)
+        if cached is None:
+            return self.insert_contract(contract, document)
+        if not self._matches(contract.id):
+            self._remove_row(row)
+            return -1
+
+        key = self._sort_key(contract)
+        page = self._page_of_row(row)
+        keys = cached.keys
+        lower = keys[offset - 1] if offset > 0 else self._cursors[page]
+        upper_ok = (self._before(key, keys[offset + 1]) if offset + 1 < len(keys)
+                    else not self._before(self._cursors[page + 1], key))
+        if (lower is None or self._before(lower, key)) and upper_ok:
+            cached.pop(offset)
+            cached.insert(offset, contract, key, self._today, self._share,
+                          self._document(contract.id, document))
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self._headers) - 1))
+            return row
+
+        self._remove_row(row)
+        return self.insert_contract(contract, document)
+
+    def find_row(self, contract_id):
+        """Номер строки договора среди страниц в памяти или -1"""
+        for page, cached in self._pages.items():
+            if contract_id in cached.ids:
+                return self._starts[page] + cached.ids.index(contract_id)
+        return -1
+
+    def _fetch_contracts(self, ids):
+        """Строки договоров из базы (без учета фильтра): {id: строка}"""
+        ids = list(ids)
+        contracts = {}
+        for i in range(0, len(ids), IDS_CHUNK):
+            for row in self._execute(
+                    select(*ROW_COLUMNS).where(Contract.id.in_(ids[i:i + IDS_CHUNK]))):
+                contracts[row.id] = row
+        return contracts
+
+    def apply_changes(self, changed, deleted, inserted=()):
+        """Применяет изменения из журнала (сделанные другими копиями программы).
+
+        Строки договоров, которые есть в памяти, обновляются точечно.
+        Если изменение могло затронуть выгруженную из памяти страницу,
+        таблица перечитывается целиком. Возвращает True, если обошлось
+        без перечитывания."""
+        evicted = len(self._pages) < len(self._sizes)
+        stale = recount = False
+
+        for contract_id in deleted:
+            if contract_id in self._removed:
+                self._removed.discard(contract_id)
+                continue
+            row = self.find_row(contract_id)
+            if row >= 0:
+                self._remove_row(row)
+            else:
+                stale = stale or evicted
+                recount = True
+
+        contracts = self._fetch_contracts(changed) if changed else {}
+        documents = self._documents(contracts) if contracts else {}
+        for contract_id in changed:
+            contract = contracts.get(contract_id)
+            row = self.find_row(contract_id)
+            if contract is None:
+                if row >= 0:
+                    self._remove_row(row)
+            elif row >= 0:
+                self.update_contract(row, contract, documents.get(contract_id, ""))
+            elif contract_id in inserted:
+                # Новый договор: ни в памяти, ни на выгруженных страницах его не было.
+                # Если он лег за подгруженные строки, итог пересчитывается по базе:
+                # собственную вставку окна insert_contract уже учел
+                if self.insert_contract(contract, documents.get(contract_id, "")) < 0:
+                    recount = True
+            else:
+                # Договор, которого нет среди строк в памяти: его прежняя
+                # строка могла остаться на выгруженной странице
+                stale = stale or evicted
+                recount = True
+                if not stale:
+                    self.insert_contract(contract, documents.get(contract_id, ""))
+
+        stale = stale or any(
+            len(cached) != self._sizes[page] for page, cached in self._pages.items())
+        if not stale and recount:
+            total = self._count()
+            stale = total < self._fetched
+            self._total = total
+        if stale:
+            self.refresh()
+        return not stale
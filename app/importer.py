@@ -0,0 +1,245 @@
+from datetime import date
+from itertools import islice
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from . import diagnostics
+from .models import Contract
+from .search import contract_search_keys, index_counterparties
+
+REQUIRED_COLUMNS = ["Номер", "Наименование", "Контрагент", "Дата начала", "Дата окончания"]
+DESCRIPTION_COLUMN = "Описание"
+
+# Режимы обработки договоров, номер которых уже есть в базе
+MODE_SKIP = "skip"      # новые добавляются, существующие пропускаются
+MODE_UPDATE = "update"  # существующие обновляются, новые пропускаются
+MODE_UPSERT = "upsert"  # новые добавляются, существующие обновляются
+IMPORT_MODES = (MODE_SKIP, MODE_UPDATE, MODE_UPSERT)
+
+# Количество строк, обрабатываемых и сохраняемых одной транзакцией
+CHUNK_SIZE = 5000
+# Сколько текстов ошибок сохранять (счетчик ведется по всем)
+MAX_ERRORS = 1000
+
+_contracts = Contract.__table__
+
+
+class ImportResult:
+    """Итоги импорта договоров"""
+
+    def __init__(self):
+        self.imported = 0
+        self.updated = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"Строка {row_number}: {message}")
+
+    def message(self, limit=5):
+        """Текстовый отчет для пользователя"""
+        message = f"Импорт завершен. Успешно: {self.imported}, Пропущено: {self.skipped}"
+        if self.updated:
+            message += f", Обновлено: {self.updated}"
+        if self.error_count:
+            message += f"\nОшибки ({self.error_count}):\n" + "\n".join(self.errors[:limit])
+            if self.error_count > limit:
+                message += f"\n...и еще {self.error_count - limit} ошибок"
+        return message
+
+
+def read_rows(file_path):
+    """Построчно читает первый лист книги: сначала заголовок, затем значения"""
+    if file_path.lower().endswith('.xlsx'):
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        # Старый формат .xls openpyxl не читает
+        df = pd.read_excel(file_path, header=None, dtype=object)
+        yield from df.itertuples(index=False, name=None)
+
+
+def count_rows(file_path):
+    """Число строк данных по размерам листа (0, если размер неизвестен)"""
+    if not file_path.lower().endswith('.xlsx'):
+        return 0
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return max((workbook.active.max_row or 1) - 1, 0)
+    finally:
+        workbook.close()
+
+
+def parse_dates(values):
+    """Векторно разбирает даты формата ДД.ММ.ГГГГ (или даты Excel), ошибки -> None"""
+    series = pd.Series(values, dtype=object)
+    # Ячейки с датой Excel приходят как datetime, текстовые - как строки;
+    # в пачке могут быть и те, и другие (или только даты)
+    is_text = series.map(lambda value: isinstance(value, str)).astype(bool)
+    is_date = series.map(lambda value: isinstance(value, date)).astype(bool)
+    parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    if is_date.any():
+        parsed[is_date] = pd.to_datetime(series[is_date], errors="coerce")
+    if is_text.any():
+        parsed[is_text] = pd.to_datetime(
+            series[is_text].str.strip(), format="%d.%m.%Y", errors="coerce")
+    return [None if pd.isna(value) else value.date() for value in parsed]
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return str(value).strip()
+
+
+def _prepare_chunk(chunk, columns, first_row, seen, result):
+    """Проверяет строки пачки и превращает их в параметры для INSERT/UPDATE"""
+    def column(name):
+        index = columns.get(name)
+        return [row[index] if index is not None and index < len(row) else None for row in chunk]
+
+    numbers = [_text(value) for value in column("Номер")]
+    names = [_text(value) for value in column("Наименование")]
+    counterparties = [_text(value) for value in column("Контрагент")]
+    descriptions = [_text(value) or None for value in column(DESCRIPTION_COLUMN)]
+    start_dates = parse_dates(column("Дата начала"))
+    end_dates = parse_dates(column("Дата окончания"))
+
+    rows = []
+    for i, number in enumerate(numbers):
+        row_number = first_row + i
+        if all(value is None or value == "" for value in chunk[i]):
+            continue
+        if not number or not names[i] or not counterparties[i]:
+            result.add_error(row_number, "не заполнены обязательные поля")
+            continue
+        if start_dates[i] is None or end_dates[i] is None:
+            result.add_error(row_number, "неверный формат даты (ожидается ДД.ММ.ГГГГ)")
+            continue
+        if number in seen:
+            result.skipped += 1
+            result.add_error(row_number, f"повторяющийся в файле номер {number}")
+            continue
+        seen.add(number)
+        rows.append((row_number, {
+            "number": number,
+            "name": names[i],
+            "counterparty": counterparties[i],
+            "start_date": start_dates[i],
+            "end_date": end_dates[i],
+            "description": descriptions[i],
+            **contract_search_keys(names[i], counterparties[i]),
+        }))
+    return rows
+
+
+def _update_statement():
+    return update(_contracts).where(_contracts.c.number == bindparam("b_number")).values(
+        name=bindparam("name"),
+        counterparty=bindparam("counterparty"),
+        start_date=bindparam("start_date"),
+        end_date=bindparam("end_date"),
+        description=bindparam("description"),
+        name_key=bindparam("name_key"),
+        counterparty_key=bindparam("counterparty_key"),
+        version_id=_contracts.c.version_id + 1,
+    )
+
+
+def _write_chunk(session, rows, mode, result):
+    """Сохраняет пачку договоров пакетными запросами в одной транзакции"""
+    numbers = [values["number"] for _, values in rows]
+    existing = set(session.execute(
+        select(_contracts.c.number).where(_contracts.c.number.in_(numbers))).scalars())
+
+    to_insert = []
+    to_update = []
+    for row_number, values in rows:
+        if values["number"] in existing:
+            if mode == MODE_SKIP:
+                result.skipped += 1
+            else:
+                to_update.append((row_number, dict(values, b_number=values["number"])))
+        elif mode == MODE_UPDATE:
+            result.skipped += 1
+        else:
+            to_insert.append((row_number, values))
+
+    # Пакетная запись идет в обход ORM, поэтому триграммы контрагентов добавляем сами
+    keys = [values["counterparty_key"] for _, values in to_insert + to_update]
+    try:
+        if to_insert:
+            session.execute(insert(_contracts), [values for _, values in to_insert])
+        if to_update:
+            session.execute(_update_statement(), [values for _, values in to_update])
+        index_counterparties(session, keys)
+        session.commit()
+        result.imported += len(to_insert)
+        result.updated += len(to_update)
+    except SQLAlchemyError:
+        # Пачка не прошла целиком - сохраняем построчно, чтобы найти ошибочные строки
+        session.rollback()
+        _write_rows_individually(session, to_insert, to_update, result)
+        index_counterparties(session, keys)
+        session.commit()
+
+
+def _write_rows_individually(session, to_insert, to_update, result):
+    for statement, items, counter in (
+        (insert(_contracts), to_insert, "imported"),
+        (_update_statement(), to_update, "updated"),
+    ):
+        for row_number, values in items:
+            try:
+                session.execute(statement, values)
+                session.commit()
+                setattr(result, counter, getattr(result, counter) + 1)
+            except SQLAlchemyError as e:
+                session.rollback()
+                result.add_error(row_number, str(getattr(e, 'orig', None) or e))
+
+
+def import_contracts(session, file_path, mode=MODE_SKIP, chunk_size=CHUNK_SIZE, progress=None):
+    """Потоковый импорт договоров из Excel пачками по chunk_size строк.
+
+    progress(обработано, всего) вызывается после каждой пачки; исключение
+    из него прерывает импорт (уже сохраненные пачки остаются в базе).
+    При отсутствии обязательных колонок вызывает ValueError."""
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Неизвестный режим импорта: {mode}")
+
+    with diagnostics.timed('import'):
+        rows = read_rows(file_path)
+        try:
+            header = next(rows, None) or ()
+            columns = {_text(name): index for index, name in enumerate(header)}
+            missing_cols = [col for col in REQUIRED_COLUMNS if col not in columns]
+            if missing_cols:
+                raise ValueError(f"Отсутствуют обязательные колонки: {', '.join(missing_cols)}")
+
+            total = count_rows(file_path) if progress else 0
+            result = ImportResult()
+            seen = set()
+            # Первая строка данных в Excel - вторая (после заголовка)
+            first_row = 2
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                prepared = _prepare_chunk(chunk, columns, first_row, seen, result)
+                if prepared:
+                    _write_chunk(session, prepared, mode, result)
+                first_row += len(chunk)
+                if progress:
+                    progress(first_row - 2, total)
+        finally:
+            rows.close()
+
+    return result
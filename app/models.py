@@ -1,38 +1,94 @@
-from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey
-from sqlalchemy.orm import relationship
-from sqlalchemy.ext.declarative import declarative_base
-from datetime import date
-
-Base = declarative_base()
-
-class Contract(Base):
-    __tablename__ = 'contracts'
-    
-    id = Column(Integer, primary_key=True)
-    number = Column(String(50), nullable=False, unique=True)
-    name = Column(String(200), nullable=False)
-    counterparty = Column(String(200), nullable=False)
-    start_date = Column(Date, nullable=False)
-    end_date = Column(Date, nullable=False)
-    description = Column(Text)
-    status = Column(String(20), default='active')
-    
-    documents = relationship("Document", back_populates="contract")
-    
-    def days_remaining(self):
-        return (self.end_date - date.today()).days
-    
-    def is_expiring_soon(self, days=30):
-        return 0 <= self.days_remaining() <= days
-
-class Document(Base):
-    __tablename__ = 'documents'
-    
-    id = Column(Integer, primary_key=True)
-    contract_id = Column(Integer, ForeignKey('contracts.id'))
-    file_name = Column(String(255), nullable=False)
-    file_path = Column(String(512), nullable=False)
-    upload_date = Column(Date, default=date.today())
-    
-    contract = relationship("Contract", back_populates="documents")
-    
\ No newline at end of file
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Text, ForeignKey, Index, func
+from sqlalchemy.orm import relationship
+from sqlalchemy.ext.declarative import declarative_base
+from datetime import date, datetime
+
+Base = declarative_base()
+
+class Contract(Base):
+    __tablename__ = 'contracts'
+    __table_args__ = (
+        Index('ix_contracts_status_end_date', 'status', 'end_date'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    number = Column(String(50), nullable=False, unique=True)
+    name = Column(String(200), nullable=False, index=True)
+    counterparty = Column(String(200), nullable=False, index=True)
+    start_date = Column(Date, nullable=False, index=True)
+    end_date = Column(Date, nullable=False, index=True)
+    description = Column(Text)
+    status = Column(String(20), default='active')
+    # Нормализованные наименование и контрагент для поиска (см. normalize.py);
+    # заполняются при сохранении
+    name_key = Column(String(200))
+    counterparty_key = Column(String(200), index=True)
+    # Версия строки: изменение устаревшей копии договора вызывает StaleDataError
+    version_id = Column(Integer, nullable=False, server_default='1')
+    
+    # Документы удаляются вместе с договором средствами базы (ON DELETE CASCADE,
+    # в SQLite - триггер), сессия не загружает их ради удаления
+    documents = relationship("Document", back_populates="contract", passive_deletes='all')
+    
+    __mapper_args__ = {'version_id_col': version_id}
+    
+    def days_remaining(self):
+        return (self.end_date - date.today()).days
+    
+    def is_expiring_soon(self, days=30):
+        return 0 <= self.days_remaining() <= days
+
+class Document(Base):
+    __tablename__ = 'documents'
+    
+    id = Column(Integer, primary_key=True)
+    contract_id = Column(Integer, ForeignKey('contracts.id', ondelete='CASCADE'), index=True)
+    file_name = Column(String(255), nullable=False)
+    file_path = Column(String(512), nullable=False)
+    file_size = Column(Integer)  # размер файла в байтах (для колонки таблицы)
+    sha256 = Column(String(64), index=True)
+    upload_date = Column(Date, default=date.today())
+    
+    contract = relationship("Contract", back_populates="documents")
+
+class DocumentText(Base):
+    """Сведения об индексации текста документа (сам текст - в documents_fts)"""
+    __tablename__ = 'document_texts'
+    
+    document_id = Column(Integer, ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True)
+    sha256 = Column(String(64))
+    mtime = Column(Float)  # время изменения файла на момент индексации
+    error = Column(Text)   # текст ошибки, если PDF не удалось разобрать
+    indexed_at = Column(DateTime, default=datetime.now)
+
+class SentNotification(Base):
+    """Отправленное уведомление: договор, порог (дней до окончания), дата окончания"""
+    __tablename__ = 'sent_notifications'
+    
+    contract_id = Column(Integer, ForeignKey('contracts.id', ondelete='CASCADE'), primary_key=True)
+    threshold = Column(Integer, primary_key=True)
+    end_date = Column(Date, primary_key=True)
+    sent_at = Column(DateTime, default=datetime.now)
+
+class CounterpartyTrigram(Base):
+    """Триграмма ключа контрагента для нечеткого поиска (см. search.py)"""
+    __tablename__ = 'counterparty_trigrams'
+    __table_args__ = (
+        Index('ix_counterparty_trigrams_key', 'counterparty_key'),
+        {'sqlite_with_rowid': False},
+    )
+    
+    trigram = Column(String(3), primary_key=True)
+    counterparty_key = Column(String(200), primary_key=True)
+
+class ChangeLogEntry(Base):
+    """Запись журнала изменений (заполняется триггерами, см. changes.py)"""
+    __tablename__ = 'change_log'
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    version = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    contract_id = Column(Integer)
+    operation = Column(String(1), nullable=False)  # I - вставка, U - изменение, D - удаление
+    changed_at = Column(DateTime, server_default=func.current_timestamp())
@@ -0,0 +1,42 @@
+"""Нормализация названий для поиска.
+
+Контрагентов вводят вручную, поэтому один и тот же встречается как
+"ООО «Ромашка»", "ООО Ромашка" и "Ромашка ООО". Ключ поиска убирает
+такие различия: регистр (casefold, в том числе для кириллицы), ё/е,
+кавычки и знаки препинания, организационно-правовую форму.
+"""
+import re
+
+# Организационно-правовые формы, которые не участвуют в поиске
+LEGAL_FORMS = {
+    'ооо', 'оао', 'зао', 'пао', 'ао', 'нао', 'ип', 'фгуп', 'гуп', 'муп', 'нко', 'ано',
+    'тоо', 'кфх', 'llc', 'ltd', 'inc', 'gmbh',
+}
+
+_WORD = re.compile(r'\w+')
+
+
+def _words(text):
+    return _WORD.findall((text or '').casefold().replace('ё', 'е'))
+
+
+def normalize_text(text):
+    """Слова текста в нижнем регистре через пробел, без знаков препинания; ё -> е"""
+    return ' '.join(_words(text))
+
+
+def search_key(text):
+    """Ключ поиска контрагента: normalize_text без организационно-правовой формы"""
+    words = _words(text)
+    significant = [word for word in words if word not in LEGAL_FORMS]
+    # Название из одной формы ("ИП") оставляем как есть
+    return ' '.join(significant or words)
+
+
+def trigrams(text):
+    """Триграммы слов нормализованного текста (слово дополняется пробелами, как в pg_trgm)"""
+    result = set()
+    for word in text.split():
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
@@ -1,23 +1,48 @@
-from datetime import date, timedelta
-from .models import Contract
-
-def check_expiring_contracts(session, days=30):
-    """Проверяет договоры, которые скоро истекают"""
-    today = date.today()
-    end_date = today + timedelta(days=days)
-    
-    expiring_contracts = session.query(Contract).filter(
-        Contract.end_date >= today,
-        Contract.end_date <= end_date,
-        Contract.status == 'active'
-    ).all()
-    
-    return expiring_contracts
-
-def send_notification(contract):
-    """Отправляет уведомление о скором окончании договора"""
-    days_left = (contract.end_date - date.today()).days
-    print(f"\n! ВНИМАНИЕ: Договор {contract.number} '{contract.name}' "
-          f"с {contract.counterparty} истекает через {days_left} дней "
-          f"(до {contract.end_date.strftime('%d.%m.%Y')})")
-    
\ No newline at end of file
+import sqlite3
+from collections import namedtuple
+from datetime import date, timedelta
+from pathlib import Path
+
+# Облегченная строка договора для проверки без ORM
+ExpiringContract = namedtuple('ExpiringContract', 'number name counterparty end_date')
+
+def check_expiring_contracts(session, days=30):
+    """Проверяет договоры, которые скоро истекают"""
+    from .models import Contract
+    
+    today = date.today()
+    end_date = today + timedelta(days=days)
+    
+    expiring_contracts = session.query(Contract).filter(
+        Contract.end_date >= today,
+        Contract.end_date <= end_date,
+        Contract.status == 'active'
+    ).all()
+    
+    return expiring_contracts
+
+def find_expiring_contracts(db_path, days=30):
+    """То же, что check_expiring_contracts, но напрямую через sqlite3.
+
+    Не загружает SQLAlchemy, поэтому подходит для частого запуска из cron.
+    База открывается только для чтения."""
+    today = date.today()
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    with sqlite3.connect(uri, uri=True) as conn:
+        rows = conn.execute(
+            "SELECT number, name, counterparty, end_date FROM contracts "
+            "WHERE status = 'active' AND end_date >= ? AND end_date <= ? "
+            "ORDER BY end_date",
+            (today.isoformat(), (today + timedelta(days=days)).isoformat())
+        ).fetchall()
+    return [
+        ExpiringContract(number, name, counterparty, date.fromisoformat(end_date))
+        for number, name, counterparty, end_date in rows
+    ]
+
+def send_notification(contract):
+    """Отправляет уведомление о скором окончании договора"""
+    days_left = (contract.end_date - date.today()).days
+    print(f"\n! ВНИМАНИЕ: Договор {contract.number} '{contract.name}' "
+          f"с {contract.counterparty} истекает через {days_left} дней "
+          f"(до {contract.end_date.strftime('%d.%m.%Y')})")
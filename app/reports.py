@@ -0,0 +1,158 @@
+"""Аналитические отчеты по договорам: окончания по месяцам, контрагенты,
+средняя длительность и календарь продлений.
+
+Договоры читаются одним запросом только нужных колонок в DataFrame,
+а показатели считаются векторными операциями pandas, без циклов Python
+по строкам. Готовые отчеты кэшируются по версии изменений таблицы
+contracts (журнал изменений, см. changes.py): повторное открытие отчета
+без правок стоит одного запроса версии.
+"""
+import threading
+from collections import namedtuple
+from datetime import date
+from sqlalchemy import select, func
+from .models import Contract, ChangeLogEntry
+
+# На сколько месяцев вперед строить календарь продлений
+RENEWAL_MONTHS = 12
+
+# Итоги и таблицы отчета (таблицы - DataFrame)
+Reports = namedtuple('Reports', [
+    'today', 'total', 'active',
+    'average_days', 'median_days',  # длительность договора в днях
+    'by_month',         # month ('ГГГГ-ММ'), contracts - окончания по месяцам
+    'by_counterparty',  # counterparty, contracts, active, average_days, next_end
+    'renewals',         # number, name, counterparty, end_date, days_left, month
+])
+
+# Таблица отчета для показа и выгрузки в Excel
+ReportTable = namedtuple('ReportTable', 'title headers rows')
+
+_contracts = Contract.__table__
+_log = ChangeLogEntry.__table__
+_lock = threading.Lock()
+_cache = {}  # (адрес базы, дата, месяцев) -> (версия, Reports)
+
+
+def change_version(session):
+    """Версия данных договоров для кэша.
+
+    В SQLite - номер последней записи журнала изменений по таблице contracts;
+    без журнала (другие СУБД) - число строк, наибольший id и сумма версий строк."""
+    if session.get_bind().dialect.name == 'sqlite':
+        return session.execute(
+            select(_log.c.version).where(_log.c.table_name == 'contracts')
+            .order_by(_log.c.version.desc()).limit(1)).scalar()
+    c = _contracts.c
+    return tuple(session.execute(
+        select(func.count(), func.max(c.id), func.sum(c.version_id))).one())
+
+
+def load_frame(session):
+    """Колонки договоров для отчетов одним запросом; даты - datetime64"""
+    import pandas as pd
+
+    c = _contracts.c
+    frame = pd.read_sql(
+        select(c.id, c.number, c.name, c.counterparty, c.start_date, c.end_date),
+        session.connection())
+    frame['start_date'] = pd.to_datetime(frame['start_date'])
+    frame['end_date'] = pd.to_datetime(frame['end_date'])
+    return frame
+
+
+def compute_reports(frame, today=None, months=RENEWAL_MONTHS):
+    """Считает отчеты по DataFrame из load_frame"""
+    import pandas as pd
+
+    today = pd.Timestamp(today or date.today())
+    end = frame['end_date']
+    duration = (end - frame['start_date']).dt.days
+    active = end >= today
+
+    by_month = end.dt.to_period('M').value_counts().sort_index()
+    by_month = pd.DataFrame({'month': by_month.index.strftime('%Y-%m'),
+                             'contracts': by_month.to_numpy()})
+
+    by_counterparty = (
+        frame.assign(active=active, duration=duration, upcoming=end.where(active))
+        .groupby('counterparty', sort=False)
+        .agg(contracts=('id', 'size'), active=('active', 'sum'),
+             average_days=('duration', 'mean'), next_end=('upcoming', 'min'))
+        .reset_index()
+        .sort_values(['contracts', 'counterparty'], ascending=[False, True], ignore_index=True))
+    by_counterparty['average_days'] = by_counterparty['average_days'].round().astype('Int64')
+
+    horizon = today + pd.DateOffset(months=months)
+    renewals = frame.loc[active & (end < horizon),
+                         ['number', 'name', 'counterparty', 'end_date']]
+    renewals = renewals.assign(
+        days_left=(renewals['end_date'] - today).dt.days,
+        month=renewals['end_date'].dt.strftime('%Y-%m'),
+    ).sort_values(['end_date', 'number'], ignore_index=True)
+
+    return Reports(
+        today.date(), len(frame), int(active.sum()),
+        None if frame.empty else round(float(duration.mean())),
+        None if frame.empty else round(float(duration.median())),
+        by_month, by_counterparty, renewals,
+    )
+
+
+def get_reports(session, months=RENEWAL_MONTHS):
+    """Отчеты из кэша; пересчитываются после изменения договоров и в новый день"""
+    today = date.today()
+    key = (str(session.get_bind().url), today, months)
+    version = change_version(session)
+    with _lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    reports = compute_reports(load_frame(session), today, months)
+    with _lock:
+        # Отчеты за прошлые дни больше не понадобятся
+        for old in [old for old in _cache if old[1] != today]:
+            del _cache[old]
+        _cache[key] = (version, reports)
+    return reports
+
+
+def _rows(frame):
+    """Строки DataFrame для таблицы: даты - date, пропуски - None"""
+    frame = frame.copy()
+    for name in frame.columns:
+        if frame[name].dtype.kind == 'M':
+            frame[name] = frame[name].dt.date
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+def report_tables(reports):
+    """Таблицы отчета для показа и выгрузки: сводка, месяцы, контрагенты, календарь"""
+    summary = [
+        ("Дата отчета", reports.today),
+        ("Всего договоров", reports.total),
+        ("Активных", reports.active),
+        ("Средняя длительность, дней", reports.average_days),
+        ("Медианная длительность, дней", reports.median_days),
+    ]
+    return [
+        ReportTable("Сводка", ["Показатель", "Значение"], summary),
+        ReportTable("Окончания по месяцам", ["Месяц", "Договоров"], _rows(reports.by_month)),
+        ReportTable("Контрагенты",
+                    ["Контрагент", "Договоров", "Активных", "Средняя длительность, дней",
+                     "Ближайшее окончание"],
+                    _rows(reports.by_counterparty)),
+        ReportTable("Календарь продлений",
+                    ["Номер", "Наименование", "Контрагент", "Окончание", "Дней осталось",
+                     "Месяц"],
+                    _rows(reports.renewals)),
+    ]
+
+
+def export_reports(reports, file_path):
+    """Выгружает отчеты в книгу Excel, по листу на таблицу"""
+    from .exporter import write_report_xlsx
+
+    return write_report_xlsx(report_tables(reports), file_path)
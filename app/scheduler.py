@@ -0,0 +1,208 @@
+import heapq
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, insert
+from .changes import current_version, read_changes
+from .models import Contract, SentNotification
+
+# Пороги уведомлений: за сколько дней до окончания договора предупреждать
+THRESHOLDS = (30, 7, 1, 0)
+# На сколько дней вперед (сверх наибольшего порога) держать договоры в очереди
+HORIZON_DAYS = 30
+
+_contracts = Contract.__table__
+_sent = SentNotification.__table__
+
+
+class ExpiryScheduler:
+    """Очередь предстоящих уведомлений об окончании договоров.
+
+    В min-куче лежат даты срабатывания порогов (окончание минус порог) для
+    договоров, истекающих в ближайшем окне. Изменения договоров применяются
+    точечно; устаревшие элементы кучи отбрасываются при извлечении.
+    Отправленные уведомления записываются в sent_notifications, поэтому
+    повторная проверка не перебирает все договоры."""
+
+    def __init__(self, thresholds=THRESHOLDS, horizon_days=HORIZON_DAYS):
+        self.thresholds = tuple(sorted(set(thresholds), reverse=True))
+        self.horizon_days = horizon_days
+        self._heap = []
+        # id договора -> (дата окончания, номер, наименование, контрагент)
+        self._contracts = {}
+        # (id договора, порог, дата окончания) уже отправленных уведомлений
+        self._sent = set()
+        self._loaded_until = None
+
+    def load(self, session, today=None):
+        """Полная загрузка окна договоров (при запуске или после массового импорта)"""
+        today = today or date.today()
+        self._heap = []
+        self._contracts = {}
+        self._sent = set()
+        self._loaded_until = today - timedelta(days=1)
+        self._extend(session, today, today + timedelta(days=self.thresholds[0] + self.horizon_days))
+
+    def _extend(self, session, today, until):
+        """Догружает договоры, истекающие после уже загруженного окна и до until"""
+        start = max(self._loaded_until + timedelta(days=1), today)
+        rows = session.execute(
+            select(_contracts.c.id, _contracts.c.end_date, _contracts.c.number,
+                   _contracts.c.name, _contracts.c.counterparty)
+            .where(_contracts.c.status == 'active',
+                   _contracts.c.end_date >= start,
+                   _contracts.c.end_date <= until)
+        ).all()
+        sent = session.execute(
+            select(_sent.c.contract_id, _sent.c.threshold, _sent.c.end_date)
+            .where(_sent.c.end_date >= start, _sent.c.end_date <= until)
+        ).all()
+
+        self._sent.update(tuple(row) for row in sent)
+        for contract_id, end_date, number, name, counterparty in rows:
+            self._add(contract_id, end_date, number, name, counterparty)
+        self._loaded_until = until
+
+    def _add(self, contract_id, end_date, number, name, counterparty):
+        self._contracts[contract_id] = (end_date, number, name, counterparty)
+        for threshold in self.thresholds:
+            if (contract_id, threshold, end_date) not in self._sent:
+                fire = end_date - timedelta(days=threshold)
+                heapq.heappush(self._heap, (fire, contract_id, threshold, end_date))
+
+    def contract_changed(self, contract):
+        """Учитывает добавленный или измененный договор"""
+        self._contracts.pop(contract.id, None)
+        if self._loaded_until is None or contract.status not in (None, 'active'):
+            return
+        # Договоры за пределами окна подхватит следующая догрузка
+        if date.today() <= contract.end_date <= self._loaded_until:
+            self._add(contract.id, contract.end_date, contract.number,
+                      contract.name, contract.counterparty)
+
+    def contract_removed(self, contract_id):
+        """Учитывает удаленный договор"""
+        self._contracts.pop(contract_id, None)
+
+    def apply_changes(self, session, changes):
+        """Учитывает изменения из журнала (changes.ChangeSet), сделанные другими
+        процессами: перечитываются только измененные договоры"""
+        if changes.reset or self._loaded_until is None:
+            self.load(session)
+            return
+        for contract_id in changes.deleted:
+            self.contract_removed(contract_id)
+        if not changes.changed:
+            return
+        rows = session.execute(
+            select(_contracts.c.id, _contracts.c.status, _contracts.c.end_date,
+                   _contracts.c.number, _contracts.c.name, _contracts.c.counterparty)
+            .where(_contracts.c.id.in_(changes.changed))
+        ).all()
+        for row in rows:
+            self.contract_changed(row)
+        # Договор изменен и затем удален
+        for contract_id in changes.changed - {row.id for row in rows}:
+            self.contract_removed(contract_id)
+
+    def _refill_date(self):
+        # После этой даты в очередь могут попасть договоры за пределами окна
+        return self._loaded_until - timedelta(days=self.thresholds[0])
+
+    def next_wakeup(self):
+        """Дата, когда нужно проверить очередь в следующий раз (или None)"""
+        if self._loaded_until is None:
+            return None
+        wakeup = self._refill_date()
+        if self._heap:
+            wakeup = min(wakeup, self._heap[0][0])
+        return wakeup
+
+    def due(self, session, today=None):
+        """Извлекает наступившие уведомления и отмечает их отправленными.
+
+        Возвращает список (договор, порог, дней осталось), где договор -
+        кортеж (id, номер, наименование, контрагент, дата окончания).
+        Если пропущено несколько порогов, уведомление одно - по ближайшему."""
+        today = today or date.today()
+        if self._loaded_until is None:
+            self.load(session, today)
+        elif today >= self._refill_date():
+            self._extend(session, today,
+                         today + timedelta(days=self.thresholds[0] + self.horizon_days))
+
+        fired = {}
+        while self._heap and self._heap[0][0] <= today:
+            _, contract_id, threshold, end_date = heapq.heappop(self._heap)
+            current = self._contracts.get(contract_id)
+            key = (contract_id, threshold, end_date)
+            # Элемент устарел: договор удален, закрыт или срок изменился
+            if current is None or current[0] != end_date or key in self._sent:
+                continue
+            self._sent.add(key)
+            fired.setdefault(contract_id, []).append(threshold)
+
+        if not fired:
+            return []
+
+        # Уведомление могла уже отправить другая копия программы
+        for contract_id, threshold, end_date in session.execute(
+                select(_sent.c.contract_id, _sent.c.threshold, _sent.c.end_date)
+                .where(_sent.c.contract_id.in_(fired))):
+            if (threshold in fired.get(contract_id, ())
+                    and end_date == self._contracts[contract_id][0]):
+                fired[contract_id].remove(threshold)
+                if not fired[contract_id]:
+                    del fired[contract_id]
+        if not fired:
+            return []
+
+        now = datetime.now()
+        session.execute(insert(_sent), [
+            {"contract_id": contract_id, "threshold": threshold,
+             "end_date": self._contracts[contract_id][0], "sent_at": now}
+            for contract_id, thresholds in fired.items() for threshold in thresholds
+        ])
+
+        notifications = []
+        for contract_id, thresholds in fired.items():
+            end_date, number, name, counterparty = self._contracts[contract_id]
+            days_left = (end_date - today).days
+            if days_left < 0:
+                continue
+            contract = (contract_id, number, name, counterparty, end_date)
+            notifications.append((contract, min(thresholds), days_left))
+        notifications.sort(key=lambda item: item[2])
+        return notifications
+
+
+def run_forever(session_factory, notify, scheduler=None, sleep=time.sleep):
+    """Цикл для фонового процесса без Qt: спит до следующего порога и уведомляет.
+
+    Договоры, измененные другими процессами, берутся из журнала изменений:
+    при пробуждении перечитываются только они, а не все окно."""
+    scheduler = scheduler or ExpiryScheduler()
+    version = None
+    while True:
+        with session_factory() as session:
+            if version is None:
+                # Версия журнала читается до загрузки: изменения, сделанные
+                # во время загрузки, будут применены повторно, а не пропущены
+                version = current_version(session.connection())
+                scheduler.load(session)
+            else:
+                changes = read_changes(session.connection(), version)
+                version = changes.version
+                scheduler.apply_changes(session, changes)
+            for contract, threshold, days_left in scheduler.due(session):
+                notify(contract, threshold, days_left)
+            session.commit()
+        sleep(seconds_until(scheduler.next_wakeup()))
+
+
+def seconds_until(wakeup, max_seconds=24 * 60 * 60):
+    """Секунды до начала дня wakeup (не больше суток, не меньше секунды)"""
+    if wakeup is None:
+        return max_seconds
+    moment = datetime.combine(wakeup, datetime.min.time())
+    seconds = (moment - datetime.now()).total_seconds()
+    return min(max(seconds, 1), max_seconds)
@@ -0,0 +1,222 @@
+import math
+import re
+from sqlalchemy import text, Integer, column, event, select, func, insert, update, bindparam, and_, or_
+from .models import Contract, CounterpartyTrigram
+from .normalize import LEGAL_FORMS, normalize_text, search_key, trigrams
+
+# Полнотекстовый индекс по договорам (внешнее содержимое - таблица contracts)
+FTS_TABLE = 'contracts_fts'
+
+_FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        number, name, counterparty, description,
+        content='contracts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS contracts_fts_ai AFTER INSERT ON contracts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, number, name, counterparty, description)
+        VALUES (new.id, new.number, new.name, new.counterparty, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contracts_fts_ad AFTER DELETE ON contracts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, number, name, counterparty, description)
+        VALUES ('delete', old.id, old.number, old.name, old.counterparty, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contracts_fts_au
+        AFTER UPDATE OF number, name, counterparty, description ON contracts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, number, name, counterparty, description)
+        VALUES ('delete', old.id, old.number, old.name, old.counterparty, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, number, name, counterparty, description)
+        VALUES (new.id, new.number, new.name, new.counterparty, new.description);
+    END""",
+]
+
+# Нечеткий поиск контрагентов по триграммам: слова короче не сравниваются
+FUZZY_MIN_LENGTH = 4
+# Какая доля триграмм слова должна встретиться в ключе контрагента
+FUZZY_THRESHOLD = 0.5
+# Сколько наиболее похожих контрагентов учитывать
+FUZZY_LIMIT = 100
+
+# Размер пачки при заполнении ключей и триграмм
+BATCH_SIZE = 5000
+
+_contracts = Contract.__table__
+_trigrams = CounterpartyTrigram.__table__
+
+
+def create_search_index(conn):
+    """Создает полнотекстовый индекс и триггеры, заполняет индекс для существующей базы"""
+    if conn.dialect.name != 'sqlite':
+        return
+
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {"name": FTS_TABLE}).first()
+
+    for statement in _FTS_SCHEMA:
+        conn.execute(text(statement))
+
+    # Однократное заполнение индекса договорами, добавленными до его появления
+    if not exists:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def contract_search_keys(name, counterparty):
+    """Значения колонок name_key и counterparty_key договора"""
+    return {"name_key": normalize_text(name), "counterparty_key": search_key(counterparty)}
+
+
+def index_counterparties(conn, keys):
+    """Добавляет в индекс триграммы ключей контрагентов, которых там еще нет.
+
+    Ключи, которые больше не встречаются у договоров, остаются в индексе:
+    они не влияют на результат поиска."""
+    keys = sorted({key for key in keys if key})
+    known = set()
+    for i in range(0, len(keys), BATCH_SIZE):
+        known.update(conn.execute(
+            select(_trigrams.c.counterparty_key.distinct())
+            .where(_trigrams.c.counterparty_key.in_(keys[i:i + BATCH_SIZE]))).scalars())
+
+    rows = [{"trigram": trigram, "counterparty_key": key}
+            for key in keys if key not in known for trigram in trigrams(key)]
+    for i in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(_trigrams), rows[i:i + BATCH_SIZE])
+
+
+def fill_search_keys(conn):
+    """Заполняет ключи поиска договоров, у которых их нет, и индекс триграмм"""
+    statement = update(_contracts).where(_contracts.c.id == bindparam("b_id")).values(
+        name_key=bindparam("name_key"), counterparty_key=bindparam("counterparty_key"))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(_contracts.c.id, _contracts.c.name, _contracts.c.counterparty)
+            .where(_contracts.c.id > last_id, _contracts.c.counterparty_key.is_(None))
+            .order_by(_contracts.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        conn.execute(statement, [
+            dict(contract_search_keys(name, counterparty), b_id=contract_id)
+            for contract_id, name, counterparty in rows])
+        last_id = rows[-1][0]
+
+    index_counterparties(conn, conn.execute(
+        select(_contracts.c.counterparty_key.distinct())).scalars())
+
+
+def similar_counterparties(session, word):
+    """Ключи контрагентов, похожих на слово, по убыванию сходства.
+
+    Сходство - доля триграмм слова, встречающихся в ключе; так опечатка
+    в одной букве ("Ромошка") не мешает найти "ООО «Ромашка»"."""
+    grams = trigrams(normalize_text(word))
+    if not grams:
+        return []
+    shared = func.count().label("shared")
+    rows = session.execute(
+        select(_trigrams.c.counterparty_key, shared)
+        .where(_trigrams.c.trigram.in_(sorted(grams)))
+        .group_by(_trigrams.c.counterparty_key)
+        .having(func.count() >= math.ceil(FUZZY_THRESHOLD * len(grams)))
+        .order_by(shared.desc(), _trigrams.c.counterparty_key)
+        .limit(FUZZY_LIMIT)
+    ).all()
+    return [key for key, _ in rows]
+
+
+@event.listens_for(Contract, 'before_insert')
+@event.listens_for(Contract, 'before_update')
+def _set_search_keys(mapper, connection, contract):
+    keys = contract_search_keys(contract.name, contract.counterparty)
+    contract.name_key = keys["name_key"]
+    contract.counterparty_key = keys["counterparty_key"]
+
+
+def _index_flushed_counterparties(session, flush_context):
+    keys = {obj.counterparty_key for obj in list(session.new) + list(session.dirty)
+            if isinstance(obj, Contract)}
+    if keys:
+        index_counterparties(session.connection(), keys)
+
+
+def listen_sessions(factory):
+    """Пополнение индекса триграмм при сбросе сессий фабрики factory"""
+    event.listen(factory, 'after_flush', _index_flushed_counterparties)
+
+
+def build_match_query(search_text):
+    """Преобразует введенный текст в запрос FTS5: все слова, поиск по префиксу"""
+    tokens = re.findall(r'\w+', search_text)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _fts_matches(words, name="query"):
+    """Contract.id IN (договоры, содержащие все слова); name - имя параметра запроса,
+    разное для нескольких таких условий в одном запросе"""
+    matches = text(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :{name}"
+    ).bindparams(**{name: build_match_query(" ".join(words))}).columns(column('rowid', Integer))
+    return Contract.id.in_(matches)
+
+
+def _key_criteria(words, fuzzy):
+    """Условия по словам без полнотекстового индекса: номер, ключи наименования
+    и контрагента (по вхождению), похожие контрагенты"""
+    criteria = []
+    for i, word in enumerate(words):
+        normalized = normalize_text(word)
+        condition = (Contract.number.ilike(f"%{word}%") |
+                     Contract.name_key.contains(normalized, autoescape=True) |
+                     Contract.counterparty_key.contains(normalized, autoescape=True))
+        if fuzzy.get(i):
+            condition = condition | Contract.counterparty_key.in_(fuzzy[i])
+        criteria.append(condition)
+    return criteria
+
+
+def search_criteria(session, search_text, include_archive=False):
+    """Возвращает условия фильтрации договоров по строке поиска.
+
+    Договор подходит, если каждое слово найдено в номере, наименовании,
+    контрагенте или описании (по началу слова); слово, похожее на название
+    контрагента, засчитывается и с опечатками. include_archive - условия
+    для представления contracts_history (рабочие и архивные договоры)."""
+    words = re.findall(r'\w+', search_text or "")
+    if not words:
+        return []
+
+    full_text = session.get_bind().dialect.name == 'sqlite'
+    # Форма собственности в ключ контрагента не входит
+    key_words = [word for word in words if word.casefold() not in LEGAL_FORMS] or words
+    if not full_text:
+        words = key_words
+    fuzzy = {}
+    for i, word in enumerate(words):
+        if len(word) >= FUZZY_MIN_LENGTH:
+            fuzzy[i] = similar_counterparties(session, word)
+
+    if not full_text:
+        return _key_criteria(words, fuzzy)
+
+    from .document_index import document_matches
+
+    # Все слова в полнотекстовом индексе, или одно из слов - похожий контрагент,
+    # а остальные - в полнотекстовом индексе, или все слова - в тексте документов
+    alternatives = [_fts_matches(words), Contract.id.in_(document_matches(" ".join(words)))]
+    for i, keys in fuzzy.items():
+        if not keys:
+            continue
+        rest = words[:i] + words[i + 1:]
+        condition = Contract.counterparty_key.in_(keys)
+        if rest:
+            condition = and_(condition, _fts_matches(rest, f"query_{i}"))
+        alternatives.append(condition)
+    if include_archive:
+        # Архивных договоров (id < 0) нет в полнотекстовых индексах рабочей базы -
+        # они ищутся по номеру и ключам поиска, как в других СУБД
+        if key_words != words:
+            fuzzy = {i: similar_counterparties(session, word)
+                     for i, word in enumerate(key_words) if len(word) >= FUZZY_MIN_LENGTH}
+        alternatives.append(and_(Contract.id < 0, *_key_criteria(key_words, fuzzy)))
+    return [or_(*alternatives)]
@@ -0,0 +1,128 @@
+"""Сводная статистика по договорам, посчитанная агрегирующими запросами SQL.
+
+Результаты кэшируются и сбрасываются после фиксации любой транзакции,
+которая меняла договоры (через ORM или Core insert/update/delete в сессии).
+Изменения из других процессов кэш не видит - для этого есть invalidate().
+"""
+import threading
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import chain
+from sqlalchemy import select, func, case, event
+from .models import Contract
+
+# Порог "скоро истекает" по умолчанию
+EXPIRING_DAYS = 30
+# Сколько крупнейших контрагентов показывать
+TOP_COUNTERPARTIES = 50
+
+Statistics = namedtuple('Statistics', [
+    'total', 'active', 'expired', 'expiring', 'days',
+    'by_counterparty',  # [(контрагент, всего, активных)] по убыванию количества
+    'by_month',         # [('ГГГГ-ММ', окончаний)] по возрастанию месяца
+])
+
+_contracts = Contract.__table__
+_lock = threading.Lock()
+_generation = 0
+_cache = {}  # (адрес базы, days, detailed) -> (поколение, дата, Statistics)
+
+
+def invalidate():
+    """Сбрасывает кэш статистики"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.clear()
+
+
+def _month(column, dialect_name):
+    if dialect_name == 'sqlite':
+        return func.strftime('%Y-%m', column)
+    return func.to_char(column, 'YYYY-MM')
+
+
+def compute_statistics(session, days=EXPIRING_DAYS, today=None, detailed=True,
+                       top=TOP_COUNTERPARTIES):
+    """Считает статистику тремя запросами: сводка, по контрагентам, по месяцам.
+
+    Без detailed выполняется только первый запрос (для строки состояния);
+    top - сколько крупнейших контрагентов вернуть."""
+    today = today or date.today()
+    soon = today + timedelta(days=days)
+    c = _contracts.c
+    is_active = case((c.end_date >= today, 1), else_=0)
+
+    total, active, expiring = session.execute(select(
+        func.count(),
+        func.coalesce(func.sum(is_active), 0),
+        func.coalesce(func.sum(case(((c.end_date >= today) & (c.end_date <= soon), 1), else_=0)), 0),
+    ).select_from(_contracts)).one()
+
+    if not detailed:
+        return Statistics(total, active, total - active, expiring, days, [], [])
+
+    count = func.count().label('count')
+    by_counterparty = session.execute(
+        select(c.counterparty, count, func.sum(is_active))
+        .group_by(c.counterparty)
+        .order_by(count.desc(), c.counterparty)
+        .limit(top)
+    ).all()
+
+    month = _month(c.end_date, session.get_bind().dialect.name).label('month')
+    by_month = session.execute(
+        select(month, func.count()).group_by(month).order_by(month)
+    ).all()
+
+    return Statistics(
+        total, active, total - active, expiring, days,
+        [tuple(row) for row in by_counterparty],
+        [tuple(row) for row in by_month],
+    )
+
+
+def get_statistics(session, days=EXPIRING_DAYS, detailed=True):
+    """Статистика из кэша; пересчитывается после изменений договоров и в новый день"""
+    key = (str(session.get_bind().url), days, detailed)
+    today = date.today()
+    with _lock:
+        generation = _generation
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == generation and cached[1] == today:
+        return cached[2]
+
+    stats = compute_statistics(session, days, today, detailed)
+    with _lock:
+        # Пока считали, данные могли измениться - тогда не кэшируем
+        if generation == _generation:
+            _cache[key] = (generation, today, stats)
+    return stats
+
+
+def _track_orm_changes(session, flush_context):
+    if any(isinstance(obj, Contract)
+           for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['statistics_dirty'] = True
+
+
+def _track_bulk_changes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['statistics_dirty'] = True
+
+
+def _invalidate_on_commit(session):
+    if session.info.pop('statistics_dirty', False):
+        invalidate()
+
+
+def _forget_changes(session):
+    session.info.pop('statistics_dirty', None)
+
+
+def listen_sessions(factory):
+    """Сброс кэша статистики после фиксации изменений в сессиях фабрики factory"""
+    event.listen(factory, 'after_flush', _track_orm_changes)
+    event.listen(factory, 'do_orm_execute', _track_bulk_changes)
+    event.listen(factory, 'after_commit', _invalidate_on_commit)
+    event.listen(factory, 'after_rollback', _forget_changes)
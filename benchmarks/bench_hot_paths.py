@@ -0,0 +1,141 @@
+"""Замеры горячих путей: загрузка и поиск в окне, импорт, экспорт,
+проверка истекающих договоров и отрисовка ячеек таблицы."""
+import itertools
+
+import pytest
+from PySide6.QtCore import Qt
+
+from conftest import QueryCounter, record_peak_rss
+
+_counter = itertools.count()
+
+
+@pytest.fixture
+def window(qapp, engine):
+    from app.gui.main_window import MainWindow
+    window = MainWindow()
+    yield window
+    window.jobs.wait()
+    window.session.close()
+    window.deleteLater()
+
+
+def test_load_contracts(measure, window):
+    measure(window.load_contracts)
+
+
+@pytest.mark.parametrize("text", ["ромаш", "д-00001", "поставки вектор"],
+                         ids=["prefix", "number", "two-words"])
+def test_search_contracts(measure, window, text):
+    window.search_edit.setText(text)
+    measure(window.search_contracts)
+
+
+def test_model_data(measure, window):
+    """Все ячейки первого экрана в ролях отображения и фона"""
+    window.load_contracts()
+    model = window.model
+    indexes = [model.index(row, column)
+               for row in range(min(model.rowCount(), 40))
+               for column in range(model.columnCount())]
+    roles = (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.BackgroundRole)
+
+    def paint():
+        for index in indexes:
+            for role in roles:
+                model.data(index, role)
+
+    measure(paint)
+
+
+def test_scroll_all_pages(measure, window):
+    """Прокрутка до конца: подгрузка всех страниц с вытеснением старых"""
+    def scroll():
+        window.load_contracts()
+        model = window.model
+        while model.canFetchMore():
+            model.fetchMore()
+            model.data(model.index(model.rowCount() - 1, 0))
+
+    measure(scroll)
+
+
+def test_table_memory(benchmark, measure, qapp, session, monkeypatch):
+    """Все страницы таблицы в памяти; в extra_info - байт на строку (tracemalloc)"""
+    import tracemalloc
+    from app.gui import table_model
+
+    monkeypatch.setattr(table_model, "MAX_PAGES", 1_000_000)
+    headers = ["Номер", "Наименование", "Контрагент", "Начало", "Окончание", "Осталось",
+               "Документ"]
+
+    def load():
+        model = table_model.ContractsTableModel(session, headers)
+        while model.canFetchMore():
+            model.fetchMore()
+        return model
+
+    tracemalloc.start()
+    try:
+        model = load()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    measure(load)
+    benchmark.extra_info["bytes_per_row"] = size // max(model.rowCount(), 1)
+
+
+def test_check_expiring(measure, session):
+    from app.notifications import check_expiring_contracts
+    measure(check_expiring_contracts, session)
+
+
+def test_find_expiring_sqlite3(measure, dataset, engine):
+    if engine.dialect.name != 'sqlite':
+        pytest.skip("быстрый путь есть только для SQLite")
+    from app.notifications import find_expiring_contracts
+    measure(find_expiring_contracts, dataset[0])
+
+
+def test_reports(measure, session):
+    """Отчеты без кэша: чтение колонок в DataFrame и расчет"""
+    from app.reports import compute_reports, load_frame
+    measure(lambda: compute_reports(load_frame(session)))
+
+
+@pytest.mark.parametrize("extension", [".xlsx", ".csv"])
+def test_export(measure, session, tmp_path, extension):
+    from app.exporter import export_contracts
+    measure(export_contracts, session, str(tmp_path / f"export{extension}"))
+
+
+def test_import(benchmark, dataset, engine, tmp_path):
+    """Импорт книги: в новую базу SQLite на каждый раунд или, для серверной
+    базы, в базу набора после удаления ранее импортированных договоров"""
+    from sqlalchemy import delete
+    from app.database import get_engine, get_session
+    from app.importer import import_contracts
+    from app.models import Contract
+
+    def remove_imported():
+        with engine.begin() as conn:
+            conn.execute(delete(Contract.__table__).where(Contract.number.like("И-%")))
+
+    def setup():
+        if engine.dialect.name == 'sqlite':
+            return (get_session(get_engine(str(tmp_path / f"import_{next(_counter)}.db"))),
+                    dataset[1]), {}
+        remove_imported()
+        return (get_session(engine), dataset[1]), {}
+
+    def run(session, file_path):
+        with QueryCounter(session.get_bind()) as counter:
+            result = import_contracts(session, file_path)
+        session.close()
+        benchmark.extra_info["queries"] = counter.count
+        benchmark.extra_info["imported"] = result.imported
+
+    benchmark.pedantic(run, setup=setup, rounds=3)
+    record_peak_rss(benchmark)
+    if engine.dialect.name != 'sqlite':
+        remove_imported()
@@ -0,0 +1,94 @@
+"""Сравнение задержек записи и чтения: новый движок на каждую сессию
+(как было раньше) против общего движка с настроенными PRAGMA.
+
+Запуск: python benchmarks/engine_latency.py [--operations 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import get_engine, session_scope
+from app.models import Base, Contract
+
+
+def legacy_session(db_path):
+    """Старое поведение get_session(): новый движок и create_all при каждом вызове"""
+    engine = create_engine(f'sqlite:///{db_path}')
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def measure(operation, count):
+    timings = []
+    for i in range(count):
+        start = time.perf_counter()
+        operation(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def new_contract(prefix, i):
+    today = date.today()
+    return Contract(
+        number=f"{prefix}-{i}", name=f"Договор {i}", counterparty="ООО Тест",
+        start_date=today, end_date=today + timedelta(days=i % 365))
+
+
+def run_legacy(db_path, count):
+
+    def write(i):
+        session = legacy_session(db_path)
+        session.add(new_contract("L", i))
+        session.commit()
+        session.close()
+
+    def read(i):
+        session = legacy_session(db_path)
+        session.get(Contract, i + 1)
+        session.close()
+
+    return measure(write, count), measure(read, count)
+
+
+def run_pooled(db_path, count):
+    engine = get_engine(db_path)
+
+    def write(i):
+        with session_scope(engine) as session:
+            session.add(new_contract("P", i))
+
+    def read(i):
+        with session_scope(engine) as session:
+            session.get(Contract, i + 1)
+
+    return measure(write, count), measure(read, count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "Движок на каждую сессию": run_legacy(os.path.join(tmp, "legacy.db"), args.operations),
+            "Общий движок + PRAGMA": run_pooled(os.path.join(tmp, "pooled.db"), args.operations),
+        }
+
+    print(f"{'Вариант':<28}{'запись, мс (p50/p95)':>24}{'чтение, мс (p50/p95)':>24}")
+    for name, ((w50, w95), (r50, r95)) in results.items():
+        print(f"{name:<28}{w50:>12.3f} / {w95:<9.3f}{r50:>12.3f} / {r95:<9.3f}")
+
+
+if __name__ == "__main__":
+    main()
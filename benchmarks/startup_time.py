@@ -0,0 +1,119 @@
+"""Проверка времени запуска графического интерфейса.
+
+1. python -X importtime: суммарное время импорта главного окна и список
+   тяжелых модулей, которые не должны загружаться при старте.
+2. Время от запуска процесса до первой отрисовки окна и до появления
+   первой страницы договоров (Qt в режиме offscreen).
+
+Завершается с кодом 1, если превышен бюджет.
+Запуск: python benchmarks/startup_time.py [--paint-budget-ms 1500] [--db путь]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые должны загружаться только по требованию
+DEFERRED_MODULES = ("pandas", "openpyxl", "pyarrow", "app.importer", "app.exporter")
+
+PROBE = r"""
+import sys, time
+from PySide6.QtCore import QEvent, QObject, QTimer
+from PySide6.QtWidgets import QApplication
+from app.database import init_db
+from app.gui.main_window import MainWindow
+
+class FirstPaint(QObject):
+    painted = None
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and self.painted is None:
+            self.painted = time.time()
+        return False
+
+app = QApplication(sys.argv)
+init_db()
+probe = FirstPaint()
+window = MainWindow()
+window.installEventFilter(probe)
+window.show()
+
+def check():
+    if probe.painted is not None and window.model is not None:
+        print(f"paint={probe.painted} data={time.time()}")
+        app.quit()
+    else:
+        QTimer.singleShot(5, check)
+
+QTimer.singleShot(0, check)
+QTimer.singleShot(30000, app.quit)
+app.exec()
+"""
+
+
+def measure_imports(env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.gui.main_window"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if not match:
+            continue
+        cumulative, indent, module = match.groups()
+        loaded.add(module)
+        if len(indent) == 1:
+            total_us += int(cumulative)
+    deferred = [m for m in DEFERRED_MODULES if m in loaded]
+    return total_us / 1000, deferred
+
+
+def measure_first_paint(env):
+    start = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+        capture_output=True, text=True, timeout=60)
+    match = re.search(r"paint=([\d.]+) data=([\d.]+)", result.stdout)
+    if not match:
+        raise RuntimeError(f"Окно не отрисовалось:\n{result.stderr}")
+    painted, loaded = (float(value) for value in match.groups())
+    return (painted - start) * 1000, (loaded - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--import-budget-ms", type=float, default=1000)
+    parser.add_argument("--paint-budget-ms", type=float, default=1500)
+    parser.add_argument("--db", help="база для замера (по умолчанию DB_PATH или data/contracts.db)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    if args.db:
+        env["DB_PATH"] = os.path.abspath(args.db)
+
+    import_ms, deferred = measure_imports(env)
+    paint_ms, data_ms = measure_first_paint(env)
+
+    print(f"Импорт главного окна:   {import_ms:8.1f} мс (бюджет {args.import_budget_ms:.0f})")
+    print(f"Первая отрисовка окна:  {paint_ms:8.1f} мс (бюджет {args.paint_budget_ms:.0f})")
+    print(f"Первая страница данных: {data_ms:8.1f} мс")
+
+    failures = []
+    if deferred:
+        failures.append(f"при старте загружаются отложенные модули: {', '.join(deferred)}")
+    if import_ms > args.import_budget_ms:
+        failures.append("превышен бюджет импорта")
+    if paint_ms > args.paint_budget_ms:
+        failures.append("превышен бюджет первой отрисовки")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
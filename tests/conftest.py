@@ -0,0 +1,26 @@
+from datetime import date
+
+import pytest
+
+from app.database import get_engine, session_scope
+from app.models import Contract, Document
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Новая база SQLite (и архив рядом с ней) во временном каталоге"""
+    monkeypatch.delenv('ARCHIVE_PATH', raising=False)
+    return get_engine(str(tmp_path / 'contracts.db'))
+
+
+def add_contract(engine, number, end_date, documents=(), counterparty="ООО Ромашка"):
+    """Добавляет договор с документами (имена файлов); возвращает id договора"""
+    with session_scope(engine) as session:
+        contract = Contract(number=number, name=f"Договор {number}", counterparty=counterparty,
+                            start_date=date(2015, 1, 1), end_date=end_date)
+        session.add(contract)
+        session.flush()
+        for file_name in documents:
+            session.add(Document(contract_id=contract.id, file_name=file_name,
+                                 file_path=f"documents/{file_name}"))
+        return contract.id
@@ -0,0 +1,112 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import archive
+from app.archive import (
+    archive_contracts, archived_contracts, archived_documents, attach, count_archived,
+    document_paths, history_adapter, _copy_batch
+)
+from app.database import session_scope
+from app.exporter import export_contracts
+from app.filters import ContractFilter
+from app.models import Contract
+
+from .conftest import add_contract
+
+
+def _archived(engine):
+    with engine.connect() as conn:
+        attach(conn)
+        return conn.execute(
+            select(archived_contracts.c.id, archived_contracts.c.original_id,
+                   archived_contracts.c.number)
+            .order_by(archived_contracts.c.id)).all()
+
+
+def test_archive_reused_ids(engine):
+    first = add_contract(engine, "А-1", date(2015, 6, 1), ["а.pdf"])
+    assert archive_contracts(engine, days=30) == 1
+
+    # Рабочая таблица пуста: SQLite выдает новому договору и документу те же id
+    second = add_contract(engine, "В-2", date(2016, 6, 1), ["в.pdf"])
+    assert second == first
+    assert archive_contracts(engine, days=30) == 1
+
+    rows = _archived(engine)
+    assert [(original_id, number) for _, original_id, number in rows] == [
+        (first, "А-1"), (first, "В-2")]
+    assert [document_paths(engine, archive_id) for archive_id, _, _ in rows] == [
+        ["documents/а.pdf"], ["documents/в.pdf"]]
+
+
+def test_archive_retry_after_copy(engine):
+    contract_id = add_contract(engine, "А-1", date(2015, 6, 1), ["а.pdf"])
+    # Сбой после записи пачки в архив, но до удаления из рабочей базы
+    with engine.connect() as conn:
+        attach(conn)
+        _copy_batch(conn, [contract_id], datetime(2024, 1, 1))
+        conn.commit()
+
+    assert archive_contracts(engine, days=30) == 1
+    assert count_archived(engine) == 1
+    with engine.connect() as conn:
+        attach(conn)
+        assert len(conn.execute(select(archived_documents.c.id)).all()) == 1
+        assert conn.execute(select(Contract.id)).all() == []
+
+
+def test_archive_copy_committed_before_delete(engine, monkeypatch):
+    contract_id = add_contract(engine, "А-1", date(2015, 6, 1), ["а.pdf"])
+
+    def fail(conn, ids):
+        raise RuntimeError("сбой")
+
+    # Сбой при удалении из рабочей базы: копия в архиве уже зафиксирована
+    monkeypatch.setattr(archive, "_delete_copied", fail)
+    with pytest.raises(RuntimeError):
+        archive_contracts(engine, days=30)
+    monkeypatch.undo()
+    assert count_archived(engine) == 1
+    with engine.connect() as conn:
+        assert conn.execute(select(Contract.id)).scalars().all() == [contract_id]
+
+    assert archive_contracts(engine, days=30) == 1
+    assert count_archived(engine) == 1
+
+
+def test_export_selected_archived(engine, tmp_path):
+    add_contract(engine, "А-1", date(2015, 6, 1))
+    archive_contracts(engine, days=30)
+    live = add_contract(engine, "В-2", date(2030, 6, 1))
+    (archive_id, _, _), = _archived(engine)
+
+    # Таблица с архивом передает id архивных договоров со знаком минус
+    file_path = tmp_path / "selected.csv"
+    with session_scope(engine) as session:
+        assert export_contracts(session, str(file_path), [live, -archive_id]) == 2
+    lines = file_path.read_text(encoding="utf-8-sig").splitlines()
+    assert [line.split(";")[0] for line in lines[1:]] == ["В-2", "А-1"]
+
+
+def test_search_includes_archived(engine):
+    add_contract(engine, "А-1", date(2015, 6, 1))
+    archive_contracts(engine, days=30)
+    add_contract(engine, "В-2", date(2030, 6, 1))
+
+    def numbers(text, include_archive):
+        with session_scope(engine) as session:
+            criteria = ContractFilter(text=text).criteria(session, include_archive=include_archive)
+        statement = select(Contract.number).where(*criteria).order_by(Contract.number)
+        with engine.connect() as conn:
+            if include_archive:
+                attach(conn)
+                statement = history_adapter().traverse(statement)
+            return conn.execute(statement).scalars().all()
+
+    # Наименование, номер, контрагент (в том числе с опечаткой и формой собственности)
+    assert numbers("договор", True) == ["А-1", "В-2"]
+    assert numbers("А-1", True) == ["А-1"]
+    assert numbers("ООО Ромошка", True) == ["А-1", "В-2"]
+    assert numbers("договор", False) == ["В-2"]
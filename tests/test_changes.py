@@ -0,0 +1,132 @@
+from datetime import date
+
+from sqlalchemy import delete, select, update
+
+from app.archive import archive_contracts
+from app.changes import ChangeTracker, read_changes
+from app.models import ChangeLogEntry, Contract, Document
+
+from .conftest import add_contract
+
+_log = ChangeLogEntry.__table__
+
+
+def _log_rows(engine, since=0):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(_log.c.table_name, _log.c.row_id, _log.c.contract_id, _log.c.operation)
+            .where(_log.c.version > since)
+            .order_by(_log.c.version)).all()
+
+
+def _changes(engine, since=0, **options):
+    with engine.connect() as conn:
+        return read_changes(conn, since, **options)
+
+
+def _version(engine):
+    return _changes(engine).version
+
+
+def test_triggers_log_every_operation(engine):
+    contract_id = add_contract(engine, "А-1", date(2030, 1, 1), ["а.pdf"])
+    with engine.begin() as conn:
+        document_id = conn.execute(select(Document.id)).scalar()
+        conn.execute(update(Contract).where(Contract.id == contract_id).values(name="Новое"))
+        conn.execute(delete(Contract).where(Contract.id == contract_id))
+    # Документы удаляются каскадом и тоже попадают в журнал
+    assert _log_rows(engine) == [
+        ("contracts", contract_id, contract_id, "I"),
+        ("documents", document_id, contract_id, "I"),
+        ("contracts", contract_id, contract_id, "U"),
+        ("documents", document_id, contract_id, "D"),
+        ("contracts", contract_id, contract_id, "D"),
+    ]
+
+
+def test_read_changes_insert_update_delete(engine):
+    kept = add_contract(engine, "А-1", date(2030, 1, 1))
+    removed = add_contract(engine, "Б-2", date(2030, 1, 1))
+    changes = _changes(engine)
+    assert (changes.changed, changes.inserted, changes.deleted) == (
+        {kept, removed}, {kept, removed}, set())
+
+    since = changes.version
+    with engine.begin() as conn:
+        conn.execute(update(Contract).where(Contract.id == kept).values(name="Новое"))
+        conn.execute(delete(Contract).where(Contract.id == removed))
+    changes = _changes(engine, since)
+    assert (changes.changed, changes.inserted, changes.deleted, changes.reset) == (
+        {kept}, set(), {removed}, False)
+    assert changes.version > since
+    # Нового ничего нет: версия остается прежней
+    assert _changes(engine, changes.version) == (changes.version, set(), set(), set(), False)
+
+
+def test_read_changes_document_marks_contract_changed(engine):
+    contract_id = add_contract(engine, "А-1", date(2030, 1, 1))
+    since = _version(engine)
+    add_contract(engine, "Б-2", date(2030, 1, 1))
+    with engine.begin() as conn:
+        conn.execute(Document.__table__.insert().values(
+            contract_id=contract_id, file_name="а.pdf", file_path="documents/а.pdf"))
+    changes = _changes(engine, since)
+    assert contract_id in changes.changed
+    assert contract_id not in changes.inserted
+
+
+def test_read_changes_inserted_then_deleted(engine):
+    contract_id = add_contract(engine, "А-1", date(2030, 1, 1), ["а.pdf"])
+    with engine.begin() as conn:
+        conn.execute(delete(Contract).where(Contract.id == contract_id))
+    changes = _changes(engine)
+    assert (changes.changed, changes.inserted, changes.deleted) == (set(), set(), {contract_id})
+
+
+def test_read_changes_reset(engine):
+    for i in range(3):
+        add_contract(engine, f"А-{i}", date(2030, 1, 1))
+    version = _version(engine)
+    # Изменений больше, чем стоит применять точечно
+    assert _changes(engine, limit=2) == (version, set(), set(), set(), True)
+    # Журнал очищен дальше сохраненной версии
+    with engine.begin() as conn:
+        conn.execute(delete(_log).where(_log.c.version <= 2))
+    assert _changes(engine, 1).reset
+    assert not _changes(engine, 2).reset
+
+
+def test_tracker_polls_data_version(engine):
+    add_contract(engine, "А-1", date(2030, 1, 1))
+    tracker = ChangeTracker(engine)
+    tracker.start()
+    try:
+        assert tracker.version == _version(engine)
+        assert tracker.poll() is None
+
+        contract_id = add_contract(engine, "Б-2", date(2030, 1, 1))
+        changes = tracker.poll()
+        assert changes.inserted == {contract_id}
+        assert tracker.version == changes.version
+        assert tracker.poll() is None
+
+        add_contract(engine, "В-3", date(2030, 1, 1))
+        tracker.sync()
+        assert tracker.version == _version(engine)
+        assert tracker.poll() is None
+    finally:
+        tracker.close()
+
+
+def test_tracker_sees_archive_move_as_delete(engine):
+    expired = add_contract(engine, "А-1", date(2015, 6, 1), ["а.pdf"])
+    active = add_contract(engine, "Б-2", date(2030, 1, 1))
+    tracker = ChangeTracker(engine)
+    tracker.start()
+    try:
+        assert archive_contracts(engine, days=30) == 1
+        changes = tracker.poll()
+        assert (changes.changed, changes.inserted, changes.deleted) == (set(), set(), {expired})
+        assert active not in changes.deleted
+    finally:
+        tracker.close()
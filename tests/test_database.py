@@ -0,0 +1,53 @@
+import sqlite3
+from datetime import date
+
+from sqlalchemy import select, func, insert
+
+from app.database import check_query_plans, get_engine, optimize, session_scope
+from app.models import Contract, Document, SentNotification
+
+from .conftest import add_contract
+
+
+def _count(engine, model):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model.__table__)).scalar()
+
+
+def test_contract_delete_cascades(engine):
+    contract_id = add_contract(engine, "Д-1", date(2030, 1, 1), ["договор.pdf"])
+    with session_scope(engine) as session:
+        session.add(SentNotification(contract_id=contract_id, threshold=30,
+                                     end_date=date(2030, 1, 1)))
+
+    with session_scope(engine) as session:
+        session.delete(session.get(Contract, contract_id))
+
+    assert _count(engine, Document) == 0
+    assert _count(engine, SentNotification) == 0
+
+
+def test_optimize_refreshes_stale_statistics(engine):
+    contract_id = add_contract(engine, "Д-1", date(2030, 1, 1), ["а.pdf", "б.pdf"])
+    documents = Document.__table__
+    with engine.begin() as conn:
+        # Статистика собрана, пока у всех документов был один договор
+        conn.exec_driver_sql("ANALYZE")
+        conn.execute(insert(documents), [
+            {"contract_id": contract_id + i, "file_name": "в.pdf", "file_path": f"documents/{i}"}
+            for i in range(1, 20000)])
+
+    optimize(engine)
+    plans = {name: ok for name, _, ok in check_query_plans(engine)}
+    assert plans["Документы договора"] and plans["Документы страницы таблицы"]
+
+
+def test_journal_mode_defaults_to_delete(tmp_path):
+    # База, созданная в режиме WAL, переводится на журнал отката (сетевой диск)
+    path = tmp_path / "wal.db"
+    with sqlite3.connect(path) as db:
+        db.execute("PRAGMA journal_mode = WAL")
+    engine = get_engine(str(path))
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+        assert conn.exec_driver_sql("PRAGMA mmap_size").scalar() == 0
@@ -0,0 +1,43 @@
+from datetime import date
+
+from sqlalchemy import update
+
+from app.database import session_scope
+from app.document_index import pending_documents, index_documents, count_unindexed
+from app.models import Document, DocumentText
+
+from .conftest import add_contract
+
+
+def test_pending_documents_without_files(engine, tmp_path, monkeypatch):
+    # Обычный выбор ожидающих документов - только запрос: файлы не открываются
+    monkeypatch.chdir(tmp_path)
+    add_contract(engine, "Д-1", date(2030, 1, 1), ["нет-файла.pdf"])
+    with session_scope(engine) as session:
+        pending = pending_documents(session)
+        assert [path for _, path, _ in pending] == ["documents/нет-файла.pdf"]
+
+        # Отсутствующий файл записывается с ошибкой и больше не ожидает индексации
+        assert index_documents(session) == (1, 1)
+        assert count_unindexed(session) == 0
+        assert pending_documents(session) == []
+        assert pending_documents(session, check_files=True) == []
+        assert session.get(DocumentText, pending[0][0]).mtime is None
+
+        # Изменился хэш содержимого - документ снова ожидает индексации
+        session.execute(update(Document.__table__).values(sha256="0" * 64))
+        assert [path for _, path, _ in pending_documents(session)] == ["documents/нет-файла.pdf"]
+
+
+def test_pending_documents_check_files(engine, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    add_contract(engine, "Д-1", date(2030, 1, 1), ["договор.pdf"])
+    with session_scope(engine) as session:
+        index_documents(session)
+        (tmp_path / "documents").mkdir()
+        (tmp_path / "documents" / "договор.pdf").write_bytes(b"%PDF-1.4")
+
+        # Файл появился: его замечает только проверка файлов
+        assert pending_documents(session) == []
+        assert [path for _, path, _ in pending_documents(session, check_files=True)] == [
+            "documents/договор.pdf"]
@@ -0,0 +1,22 @@
+import hashlib
+from pathlib import Path
+
+from app.file_manager import save_document
+
+
+def test_save_document_by_content_hash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    content = b"%PDF-1.4 " + bytes(range(256)) * 10000
+    first = tmp_path / "first.PDF"
+    second = tmp_path / "second.pdf"
+    first.write_bytes(content)
+    second.write_bytes(content)
+
+    sha256, path = save_document(str(first))
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert Path(path) == Path("data/documents") / sha256[:2] / f"{sha256}.pdf"
+    assert Path(path).read_bytes() == content
+
+    # Одинаковое содержимое хранится один раз, временных файлов не остается
+    assert save_document(str(second)) == (sha256, path)
+    assert [p for p in Path("data/documents").rglob("*") if p.is_file()] == [Path(path)]
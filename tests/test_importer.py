@@ -0,0 +1,23 @@
+from datetime import date, datetime
+
+from app.importer import parse_dates
+
+
+def test_parse_dates_text():
+    assert parse_dates([" 01.02.2024 ", "31.12.2023", "2024-01-01", "", None]) == [
+        date(2024, 2, 1), date(2023, 12, 31), None, None, None]
+
+
+def test_parse_dates_only_excel_dates():
+    values = [datetime(2024, 2, 1), datetime(2023, 12, 31, 15, 30)]
+    assert parse_dates(values) == [date(2024, 2, 1), date(2023, 12, 31)]
+
+
+def test_parse_dates_mixed():
+    values = [datetime(2024, 2, 1), " 05.03.2024", date(2022, 1, 10), "плохая", None, 45000]
+    assert parse_dates(values) == [
+        date(2024, 2, 1), date(2024, 3, 5), date(2022, 1, 10), None, None, None]
+
+
+def test_parse_dates_empty():
+    assert parse_dates([]) == []
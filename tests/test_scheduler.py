@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from app import scheduler
+from app.database import get_session
+from app.models import Contract
+
+from .conftest import add_contract
+
+
+class _Stop(Exception):
+    pass
+
+
+def _run(engine, monkeypatch, steps):
+    """Запускает run_forever; steps - действия с базой между пробуждениями"""
+    loads = []
+    load = scheduler.ExpiryScheduler.load
+    monkeypatch.setattr(scheduler.ExpiryScheduler, "load",
+                        lambda self, *args: loads.append(1) or load(self, *args))
+    notified = []
+    rounds = []
+    steps = iter(steps)
+
+    def sleep(seconds):
+        rounds.append(sorted((contract[1], threshold) for contract, threshold, _ in notified))
+        notified.clear()
+        step = next(steps, None)
+        if step is None:
+            raise _Stop
+        step()
+
+    with pytest.raises(_Stop):
+        scheduler.run_forever(lambda: get_session(engine),
+                              lambda *args: notified.append(args), sleep=sleep)
+    return rounds, len(loads)
+
+
+def test_run_forever_applies_changed_contracts(engine, monkeypatch):
+    today = date.today()
+    add_contract(engine, "А-1", today + timedelta(days=7))
+    moved = add_contract(engine, "Б-2", today + timedelta(days=40))
+    removed = add_contract(engine, "В-3", today + timedelta(days=45))
+
+    def change():
+        add_contract(engine, "Г-4", today + timedelta(days=1))
+        with engine.begin() as conn:
+            conn.execute(update(Contract).where(Contract.id.in_([moved, removed]))
+                         .values(end_date=today + timedelta(days=20)))
+            conn.execute(delete(Contract).where(Contract.id == removed))
+
+    def add():
+        add_contract(engine, "Д-5", today + timedelta(days=40))
+
+    rounds, loads = _run(engine, monkeypatch, [change, add])
+    assert rounds == [[("А-1", 7)], [("Б-2", 30), ("Г-4", 1)], []]
+    # Окно загружено один раз, дальше - только изменения из журнала
+    assert loads == 1
+
+
+def test_due_skips_notifications_sent_elsewhere(engine):
+    add_contract(engine, "А-1", date.today() + timedelta(days=7))
+    first, second = scheduler.ExpiryScheduler(), scheduler.ExpiryScheduler()
+    with get_session(engine) as session:
+        first.load(session)
+        second.load(session)
+        assert [threshold for _, threshold, _ in first.due(session)] == [7]
+        session.commit()
+        assert second.due(session) == []
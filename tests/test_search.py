@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.database import session_scope
+from app.filters import ContractFilter
+from app.models import Contract
+from app.normalize import normalize_text, search_key, trigrams
+from app.search import search_criteria, similar_counterparties
+
+from .conftest import add_contract
+
+END = date(2030, 1, 1)
+
+
+@pytest.fixture
+def contracts(engine):
+    return {
+        "ромашка": add_contract(engine, "1", END, counterparty="ООО «Ромашка»"),
+        "ромашка ооо": add_contract(engine, "2", END, counterparty="Ромашка ООО"),
+        "лютик": add_contract(engine, "3", END, counterparty="АО Лютик"),
+        "елкин": add_contract(engine, "4", END, counterparty="ИП Ёлкин"),
+    }
+
+
+def _search(engine, search_text):
+    with session_scope(engine) as session:
+        return set(session.execute(
+            select(Contract.id).where(*search_criteria(session, search_text))).scalars())
+
+
+def test_normalize():
+    assert normalize_text("ООО «Ромашка», филиал") == "ооо ромашка филиал"
+    assert normalize_text("ЁЛКИН") == "елкин"
+    assert search_key("Ромашка ООО") == search_key("ооо \"РОМАШКА\"") == "ромашка"
+    # Название из одной формы собственности остается как есть
+    assert search_key("ИП") == "ип"
+    assert trigrams("кот") == {"  к", " ко", "кот", "от "}
+
+
+def test_search_ignores_case_form_and_typos(engine, contracts):
+    expected = {contracts["ромашка"], contracts["ромашка ооо"]}
+    for search_text in ("ромашка", "РОМАШКА", "Ромошка", "ООО Ромашка", "ромаш"):
+        assert _search(engine, search_text) == expected, search_text
+
+
+def test_search_yo(engine, contracts):
+    assert _search(engine, "Елкин") == _search(engine, "ёлкин") == {contracts["елкин"]}
+
+
+def test_similar_counterparties(engine, contracts):
+    with session_scope(engine) as session:
+        assert similar_counterparties(session, "Ромошка") == ["ромашка"]
+        assert similar_counterparties(session, "Лютек") == ["лютик"]
+        assert similar_counterparties(session, "Василек") == []
+
+
+def test_counterparty_filter_prefix(engine, contracts):
+    with session_scope(engine) as session:
+        criteria = ContractFilter(counterparty="ооо «РОМ").criteria(session, date(2024, 1, 1))
+        assert set(session.execute(select(Contract.id).where(*criteria)).scalars()) == {
+            contracts["ромашка"], contracts["ромашка ооо"]}
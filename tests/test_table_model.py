@@ -0,0 +1,147 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication
+from sqlalchemy import select
+
+from app.database import get_session
+from app.gui import table_model
+from app.gui.table_model import ContractsTableModel
+from app.models import Contract
+
+from .conftest import add_contract
+
+HEADERS = ["Номер", "Наименование", "Контрагент", "Начало", "Окончание", "Осталось", "Документ"]
+BASE = date(2030, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def session(engine, qapp, monkeypatch):
+    # Маленькие страницы, чтобы вставки и удаления попадали на их границы
+    monkeypatch.setattr(table_model, "PAGE_SIZE", 5)
+    # По три договора на дату окончания: курсор страницы идет по (дате, id)
+    for i in range(23):
+        add_contract(engine, f"Д-{i:02}", BASE + timedelta(days=i // 3))
+    session = get_session(engine)
+    yield session
+    session.close()
+
+
+def _model(session, **options):
+    return ContractsTableModel(session, HEADERS, **options)
+
+
+def _fetch_all(model):
+    while model.canFetchMore():
+        model.fetchMore()
+    return [model.contract_id(row) for row in range(model.rowCount())]
+
+
+def _expected(session, *order):
+    return session.execute(select(Contract.id).order_by(*order)).scalars().all()
+
+
+def test_fetch_more_continues_from_cursor(session):
+    model = _model(session)
+    assert model.rowCount() == 5
+    assert model.total_count() == 23
+    assert _fetch_all(model) == _expected(session, Contract.end_date, Contract.id)
+    assert not model.canFetchMore()
+    assert model.index(0, 0).data() == "Д-00"
+    assert model.index(0, 4).data() == "01.01.2030"
+
+
+def test_insert_on_page_boundary(session, engine):
+    model = _model(session)
+    model.fetchMore()
+    assert model.rowCount() == 10
+    # Та же дата, что у последней строки первой страницы, но id больше всех
+    contract_id = add_contract(engine, "Н-1", BASE + timedelta(days=1))
+    row = model.insert_contract(session.get(Contract, contract_id))
+    assert model.contract_id(row) == contract_id
+    assert model.total_count() == 24
+    assert model.rowCount() == 11
+    assert _fetch_all(model) == _expected(session, Contract.end_date, Contract.id)
+
+
+def test_insert_beyond_loaded_rows(session, engine):
+    model = _model(session)
+    contract_id = add_contract(engine, "Н-1", BASE + timedelta(days=100))
+    assert model.insert_contract(session.get(Contract, contract_id)) == -1
+    assert model.rowCount() == 5
+    assert model.total_count() == 24
+    ids = _fetch_all(model)
+    assert ids == _expected(session, Contract.end_date, Contract.id)
+    assert ids.count(contract_id) == 1
+
+
+def test_update_moves_row_between_pages(session):
+    model = _model(session)
+    model.fetchMore()
+    contract = session.get(Contract, model.contract_id(0))
+    contract.end_date = BASE + timedelta(days=2)
+    session.commit()
+
+    row = model.update_contract(0, contract)
+    assert 5 <= row < 10
+    assert model.contract_id(row) == contract.id
+    assert model.rowCount() == 10
+
+    # Договор уходит за подгруженные строки и появляется, когда до него дойдет прокрутка
+    contract.end_date = BASE + timedelta(days=100)
+    session.commit()
+    assert model.update_contract(row, contract) == -1
+    assert model.rowCount() == 9
+    assert _fetch_all(model) == _expected(session, Contract.end_date, Contract.id)
+
+
+def test_remove_row(session):
+    model = _model(session)
+    model.fetchMore()
+    removed = model.contract_id(5)
+    session.delete(session.get(Contract, removed))
+    session.commit()
+
+    model.remove_row(5)
+    assert model.rowCount() == 9
+    assert model.total_count() == 22
+    ids = _fetch_all(model)
+    assert removed not in ids
+    assert ids == _expected(session, Contract.end_date, Contract.id)
+
+
+def test_sort_change_reloads_in_database_order(session):
+    model = _model(session)
+    model.fetchMore()
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert model.rowCount() == 5
+    assert _fetch_all(model) == _expected(session, Contract.name.desc(), Contract.id.desc())
+    model.sort(3)
+    assert _fetch_all(model) == _expected(session, Contract.start_date, Contract.id)
+
+
+def test_pages_reloaded_after_eviction(session, monkeypatch):
+    monkeypatch.setattr(table_model, "MAX_PAGES", 2)
+    model = _model(session)
+    ids = _fetch_all(model)
+    # Первая страница выгружена из памяти и читается заново по своему курсору
+    assert [model.contract_id(row) for row in range(len(ids))] == ids
+
+
+def test_own_insert_reported_back_counted_once(session, engine):
+    model = _model(session)
+    contract_id = add_contract(engine, "Н-1", BASE + timedelta(days=100))
+    model.insert_contract(session.get(Contract, contract_id))
+    # Журнал изменений возвращает окну его же вставку
+    assert model.apply_changes([contract_id], [], [contract_id])
+    assert model.total_count() == 24
+    assert _fetch_all(model).count(contract_id) == 1